@@ -1,14 +1,20 @@
-from .nodes.random_lora_chooser import RandomizeLoras, RandomizeLorasStack, RandomLoraChooserAdvanced
-from .nodes.character_batch_loader import SimpleCharacterLoop
-from .nodes.video_index_loader import SimpleVideoIndexLoader, SimpleVideoLoop
+from .nodes.random_lora_chooser import RandomizeLoras, RandomizeLorasStack, RandomizeLorasPool, RandomizeLorasStackPool, RandomizeLorasStackBatch, RandomLoraChooserAdvanced, LoraCacheStats
+from .nodes.character_batch_loader import SimpleCharacterLoop, SimpleCharacterList
+from .nodes.video_index_loader import SimpleVideoIndexLoader, SimpleVideoIndexBatch, SimpleVideoLoop
 from .nodes.multi_character_randomizer import MultiCharacterRandomizer, MultiCharacterMixer
 
 NODE_CLASS_MAPPINGS = {
     "RandomizeLoras": RandomizeLoras,
     "RandomizeLorasStack": RandomizeLorasStack,
+    "RandomizeLorasPool": RandomizeLorasPool,
+    "RandomizeLorasStackPool": RandomizeLorasStackPool,
+    "RandomizeLorasStackBatch": RandomizeLorasStackBatch,
     "RandomLoraChooserAdvanced": RandomLoraChooserAdvanced,
+    "LoraCacheStats": LoraCacheStats,
     "SimpleCharacterLoop": SimpleCharacterLoop,
+    "SimpleCharacterList": SimpleCharacterList,
     "SimpleVideoIndexLoader": SimpleVideoIndexLoader,
+    "SimpleVideoIndexBatch": SimpleVideoIndexBatch,
     "SimpleVideoLoop": SimpleVideoLoop,
     "MultiCharacterRandomizer": MultiCharacterRandomizer,
 }
@@ -16,9 +22,15 @@ NODE_CLASS_MAPPINGS = {
 NODE_DISPLAY_NAME_MAPPINGS = {
     "RandomizeLoras": "Randomize LoRAs",
     "RandomizeLorasStack": "Randomize LoRAs Stack",
+    "RandomizeLorasPool": "Randomize LoRAs (Pool)",
+    "RandomizeLorasStackPool": "Randomize LoRAs Stack (Pool)",
+    "RandomizeLorasStackBatch": "Randomize LoRAs Stack (Batch)",
     "RandomLoraChooserAdvanced": "Random LoRA Chooser (Advanced)",
+    "LoraCacheStats": "LoRA Cache Stats",
     "SimpleCharacterLoop": "Simple Character Loop",
+    "SimpleCharacterList": "Simple Character List",
     "SimpleVideoIndexLoader": "Simple Video Index Loader",
+    "SimpleVideoIndexBatch": "Simple Video Index Loader (Batch)",
     "SimpleVideoLoop": "Simple Video Loop",
     "MultiCharacterRandomizer": "Multi Character Randomizer",
 }
@@ -1,9 +1,29 @@
-import json
 import os
 import folder_paths
+from .character_library import load_character_library
+from .listings import input_files, timed_input_types
+from .lora_stack import LoraStack, merge_policy_input, stack_output
+from .safetensors_header import preflight_architecture, preflight_input, preflight_stack, problems_text
 from typing import Dict, List, Tuple, Any
 
 
+def build_character(library, character, index: int, incoming: LoraStack) -> Tuple[str, LoraStack, str]:
+    """(prompt, lora stack, name) for one character, with the incoming LoRAs first"""
+    # Build prompt
+    combined_prompt = ', '.join(filter(None, [library.base_prompt, character.prompt]))
+    
+    # Build LoRA stack - a copy of the already indexed incoming stack, merging duplicates by its policy
+    lora_list = LoraStack.from_upstream(incoming, incoming.policy)
+    
+    # Add style LoRA, character LoRA and additional character LoRAs
+    # Format: (lora_name, model_weight, clip_weight) - same as CR_LoRAStack
+    lora_list.extend(library.style_loras)
+    lora_list.extend(character.loras)
+    
+    character_name = character.name if character.name is not None else f'Character_{index}'
+    return combined_prompt, lora_list, character_name
+
+
 class SimpleCharacterLoop:
     """
     Simple character looper - just increments through all characters
@@ -11,11 +31,9 @@ class SimpleCharacterLoop:
     """
     
     @classmethod
+    @timed_input_types
     def INPUT_TYPES(cls):
-        input_dir = folder_paths.get_input_directory()
-        json_files = []
-        if os.path.exists(input_dir):
-            json_files = [f for f in os.listdir(input_dir) if f.endswith('.json')]
+        json_files = input_files(('.json', '.jsonl'))
         
         if not json_files:
             json_files = ["No JSON files found"]
@@ -28,6 +46,8 @@ class SimpleCharacterLoop:
             },
             "optional": {
                 "lora_stack": ("LORA_STACK",),
+                "lora_merge": merge_policy_input("keep"),
+                "lora_preflight": preflight_input("off"),
             }
         }
     
@@ -37,74 +57,37 @@ class SimpleCharacterLoop:
     FUNCTION = "loop_character"
     CATEGORY = "Character Loader"
     
-    def loop_character(self, json_file, loop_count, lora_stack=None):
+    def loop_character(self, json_file, loop_count, lora_stack=None, lora_merge="keep", lora_preflight="off"):
         
         if json_file == "No JSON files found":
             return ("Error: No JSON files found", [], "Error", "No JSON files in input directory")
         
         try:
-            # Load JSON data
+            # Load the compiled character library (cached until the file changes)
             json_path = os.path.join(folder_paths.get_input_directory(), json_file)
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            library = load_character_library(json_path)
             
-            characters = data.get('characters', [])
+            characters = library.characters
             if not characters:
                 return ("Error: No characters found", [], "Error", "No characters in JSON")
             
             total_characters = len(characters)
             current_index = loop_count % total_characters
             
-            character = characters[current_index]
-            base_style = data.get('base_style', {})
-            
-            # Build prompt
-            prompt_parts = []
-            if base_style.get('prompt'):
-                prompt_parts.append(base_style['prompt'].strip())
-            if character.get('prompt'):
-                prompt_parts.append(character['prompt'].strip())
-            
-            combined_prompt = ', '.join(filter(None, prompt_parts))
+            # Add incoming LoRA stack if provided, without "None" entries (same logic as CR_LoRAStack)
+            incoming = LoraStack.from_upstream(lora_stack, lora_merge)
+            combined_prompt, lora_list, character_name = build_character(
+                library, characters[current_index], current_index, incoming)
             
-            # Build LoRA stack - Initialize the list (same as CR_LoRAStack)
-            lora_list = list()
-            
-            # Add incoming LoRA stack if provided (same logic as CR_LoRAStack)
-            if lora_stack is not None:
-                lora_list.extend([l for l in lora_stack if l[0] != "None"])
-            
-            # Add style LoRA
-            style_lora = base_style.get('style_lora')
-            if style_lora and style_lora != "None":
-                style_strength = base_style.get('style_strength', 1.0)
-                # Format: (lora_name, model_weight, clip_weight) - same as CR_LoRAStack
-                lora_list.extend([(style_lora, style_strength, style_strength)])
-            
-            # Add character LoRA
-            char_lora = character.get('lora')
-            if char_lora and char_lora != "None":
-                char_strength = character.get('lora_strength', 1.0)
-                # Format: (lora_name, model_weight, clip_weight) - same as CR_LoRAStack
-                lora_list.extend([(char_lora, char_strength, char_strength)])
-            
-            # Add additional character LoRAs
-            additional_loras = character.get('additional_loras', [])
-            for lora_data in additional_loras:
-                if isinstance(lora_data, dict):
-                    lora_name = lora_data.get('name')
-                    if lora_name and lora_name != "None":
-                        model_strength = lora_data.get('model_strength', 1.0)
-                        clip_strength = lora_data.get('clip_strength', 1.0)
-                        # Format: (lora_name, model_weight, clip_weight) - same as CR_LoRAStack
-                        lora_list.extend([(lora_name, model_strength, clip_strength)])
-            
-            character_name = character.get('name', f'Character_{current_index}')
+            # Drop LoRAs whose files are missing or don't match the base model
+            lora_list, problems = preflight_stack(lora_list, preflight_architecture(lora_preflight))
             
             loop_info = f"Character {current_index + 1} of {total_characters}: {character_name}"
+            if problems:
+                loop_info += f"\n{problems_text(problems)}"
             
             # Return lora_list (not lora_stack) to match CR_LoRAStack format
-            return (combined_prompt, lora_list, character_name, loop_info)
+            return (combined_prompt, stack_output(lora_list), character_name, loop_info)
             
         except Exception as e:
             error_msg = f"Error: {str(e)}"
@@ -114,4 +97,89 @@ class SimpleCharacterLoop:
     @classmethod
     def IS_CHANGED(cls, **kwargs):
         # Force re-execution when loop_count changes
-        return kwargs.get("loop_count", 0)
\ No newline at end of file
+        return kwargs.get("loop_count", 0)
+
+
+class SimpleCharacterList:
+    """
+    List version of SimpleCharacterLoop - returns every character (or a range/stride
+    slice) from one library load as parallel lists
+    """
+    
+    @classmethod
+    @timed_input_types
+    def INPUT_TYPES(cls):
+        json_files = input_files(('.json', '.jsonl'))
+        
+        if not json_files:
+            json_files = ["No JSON files found"]
+            
+        return {
+            "required": {
+                "json_file": (json_files,),
+                "start_index": ("INT", {"default": 0, "min": 0, "max": 1000000, "step": 1,
+                                "tooltip": "Index of the first character (0-based)"}),
+                "count": ("INT", {"default": 0, "min": 0, "max": 1000000, "step": 1,
+                          "tooltip": "Number of characters to return (0 = all remaining)"}),
+                "stride": ("INT", {"default": 1, "min": 1, "max": 10000, "step": 1,
+                           "tooltip": "Step between consecutive characters"}),
+            },
+            "optional": {
+                "lora_stack": ("LORA_STACK",),
+                "lora_merge": merge_policy_input("keep"),
+                "lora_preflight": preflight_input("off"),
+            }
+        }
+    
+    RETURN_TYPES = ("STRING", "LORA_STACK", "STRING", "STRING")
+    RETURN_NAMES = ("character_prompts", "lora_stacks", "character_names", "list_info")
+    OUTPUT_IS_LIST = (True, True, True, False)
+    
+    FUNCTION = "list_characters"
+    CATEGORY = "Character Loader"
+    
+    def list_characters(self, json_file, start_index, count, stride, lora_stack=None, lora_merge="keep",
+                        lora_preflight="off"):
+        
+        if json_file == "No JSON files found":
+            return (["Error: No JSON files found"], [[]], ["Error"], "No JSON files in input directory")
+        
+        try:
+            # One library load for the whole list
+            json_path = os.path.join(folder_paths.get_input_directory(), json_file)
+            library = load_character_library(json_path)
+            
+            characters = library.characters
+            if not characters:
+                return (["Error: No characters found"], [[]], ["Error"], "No characters in JSON")
+            
+            total_characters = len(characters)
+            stop = total_characters if count == 0 else min(total_characters, start_index + count * stride)
+            indices = range(start_index, stop, stride)
+            if not indices:
+                return (["Error: No characters in range"], [[]], ["Error"],
+                        f"start_index {start_index} is past the last of {total_characters} characters")
+            
+            # Index the incoming stack once, each character gets a copy
+            incoming = LoraStack.from_upstream(lora_stack, lora_merge)
+            architecture = preflight_architecture(lora_preflight)
+            prompts, lora_lists, names, problems = [], [], [], []
+            for index in indices:
+                combined_prompt, lora_list, character_name = build_character(
+                    library, characters[index], index, incoming)
+                # Drop LoRAs whose files are missing or don't match the base model
+                lora_list, character_problems = preflight_stack(lora_list, architecture)
+                problems.extend(problem for problem in character_problems if problem not in problems)
+                prompts.append(combined_prompt)
+                lora_lists.append(stack_output(lora_list))
+                names.append(character_name)
+            
+            list_info = f"Characters {indices[0] + 1}-{indices[-1] + 1} (stride {stride}): {len(indices)} of {total_characters}"
+            if problems:
+                list_info += f"\n{problems_text(problems)}"
+            
+            return (prompts, lora_lists, names, list_info)
+            
+        except Exception as e:
+            error_msg = f"Error: {str(e)}"
+            return ([error_msg], [[]], ["Error"], error_msg)
@@ -0,0 +1,363 @@
+import argparse
+import json
+import math
+import os
+import struct
+import threading
+from collections import OrderedDict
+from collections.abc import Sequence
+from typing import List, NamedTuple, Optional, Tuple
+
+try:
+    from .rng import FeistelPermutation, unrank_combination, unrank_multiset
+    from .weighted_sampling import AliasTable, build_alias_table, weighted_choices, weighted_sample
+except ImportError:  # Run as a script for conversion
+    from rng import FeistelPermutation, unrank_combination, unrank_multiset
+    from weighted_sampling import AliasTable, build_alias_table, weighted_choices, weighted_sample
+
+
+class CharacterRecord(NamedTuple):
+    """Precomputed character: stripped prompt and ready-made (lora_name, model_weight, clip_weight) tuples"""
+    name: Optional[str]
+    prompt: str
+    loras: Tuple[Tuple[str, float, float], ...]
+    weight: float = 1.0
+
+
+class CharacterLibrary(NamedTuple):
+    """Compiled character file: base style plus one record per character"""
+    base_prompt: str
+    style_loras: Tuple[Tuple[str, float, float], ...]
+    characters: Tuple[CharacterRecord, ...]
+    sampler: Optional[AliasTable] = None  # Only set when some character has a non-default weight
+
+
+def character_weight(character) -> float:
+    """Selection weight of a character dict, defaults to 1.0"""
+    try:
+        return max(0.0, float(character.get('weight', 1.0)))
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid weight for character {character.get('name', '')!r}")
+
+
+def compile_base_style(base_style) -> Tuple[str, Tuple[Tuple[str, float, float], ...]]:
+    """Stripped base prompt and style LoRA tuple from a base_style dict"""
+    base_style = base_style if isinstance(base_style, dict) else {}
+    base_prompt = (base_style.get('prompt') or '').strip()
+
+    style_loras = ()
+    style_lora = base_style.get('style_lora')
+    if style_lora and style_lora != "None":
+        style_strength = base_style.get('style_strength', 1.0)
+        # Format: (lora_name, model_weight, clip_weight) - same as CR_LoRAStack
+        style_loras = ((style_lora, style_strength, style_strength),)
+    return base_prompt, style_loras
+
+
+def compile_character(character) -> CharacterRecord:
+    """Turn one character dict from the JSON file into a CharacterRecord"""
+    loras = []
+
+    # Character LoRA
+    char_lora = character.get('lora')
+    if char_lora and char_lora != "None":
+        char_strength = character.get('lora_strength', 1.0)
+        loras.append((char_lora, char_strength, char_strength))
+
+    # Additional character LoRAs
+    for lora_data in character.get('additional_loras', []) or []:
+        if isinstance(lora_data, dict):
+            lora_name = lora_data.get('name')
+            if lora_name and lora_name != "None":
+                loras.append((lora_name, lora_data.get('model_strength', 1.0), lora_data.get('clip_strength', 1.0)))
+
+    return CharacterRecord(
+        name=character.get('name'),
+        prompt=(character.get('prompt') or '').strip(),
+        loras=tuple(loras),
+        weight=character_weight(character),
+    )
+
+
+def compile_library(data) -> CharacterLibrary:
+    """Compile parsed character JSON (base_style + characters) into a CharacterLibrary"""
+    base_prompt, style_loras = compile_base_style(data.get('base_style', {}))
+    characters = tuple(compile_character(c) for c in data.get('characters', []) if isinstance(c, dict))
+
+    # Precompute the alias table once per file for weighted sampling. All-zero weights
+    # express no preference, so those libraries are sampled uniformly
+    sampler = None
+    if characters and any(c.weight != 1.0 for c in characters) and sum(c.weight for c in characters) > 0:
+        sampler = AliasTable([c.weight for c in characters])
+
+    return CharacterLibrary(base_prompt=base_prompt, style_loras=style_loras, characters=characters, sampler=sampler)
+
+
+def select_characters(library, rng, num_characters: int, allow_duplicates: bool) -> List[CharacterRecord]:
+    """
+    Pick num_characters records, weighted by each character's 'weight' when the library has
+    weights (O(1) alias draws), uniformly otherwise
+    """
+    characters = library.characters
+    if library.sampler is None:
+        if allow_duplicates:
+            return rng.choices(characters, k=num_characters)
+        return rng.sample(characters, num_characters)
+
+    if allow_duplicates:
+        indices = weighted_choices(rng, library.sampler, num_characters)
+    else:
+        indices = weighted_sample(rng, library.sampler, num_characters)
+    return [characters[i] for i in indices]
+
+
+def coverage_characters(library, seed: int, loop_count: int, num_characters: int, allow_duplicates: bool,
+                        shuffle: bool) -> Tuple[List[CharacterRecord], int, int]:
+    """
+    (records, combination number, total combinations) for loop_count in a walk over every
+    num_characters-combination of the library, each visited once before any repeats.
+    With shuffle the order is a seeded permutation of the combinations; weights are ignored
+    """
+    n = len(library.characters)
+    if allow_duplicates:
+        total = math.comb(n + num_characters - 1, num_characters)
+    else:
+        total = math.comb(n, num_characters)
+
+    position = loop_count % total
+    rank = position
+    if shuffle:
+        rank = FeistelPermutation(total, seed, f"character_coverage:{n}:{num_characters}")[position]
+
+    if allow_duplicates:
+        indices = unrank_multiset(rank, n, num_characters)
+    else:
+        indices = unrank_combination(rank, n, num_characters)
+    return [library.characters[i] for i in indices], position, total
+
+
+# Indexed libraries: a JSONL file whose first line is {"base_style": {...}} followed by one
+# character per line, plus a sidecar "<file>.idx" holding the byte offset, weight and alias table
+# entry of every character line. Characters are read on demand, so memory use does not depend on
+# library size.
+INDEX_MAGIC = b"SRLCIDX2"
+INDEX_HEADER = struct.Struct("<8sqqqq")  # magic, source mtime_ns, source size, character count, weighted
+INDEX_ENTRY = struct.Struct("<qddq")  # line offset, weight, alias prob, alias index
+MAX_CACHED_RECORDS = 256
+
+
+def index_path_for(jsonl_path: str) -> str:
+    return jsonl_path + ".idx"
+
+
+def build_index(jsonl_path: str) -> str:
+    """Scan a JSONL library once and write its sidecar offset index, streaming line by line"""
+    stat = os.stat(jsonl_path)
+    index_path = index_path_for(jsonl_path)
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+
+    offsets = []
+    weights = []
+    with open(jsonl_path, 'rb') as source:
+        offset = 0
+        first = True
+        for line in source:
+            line_offset = offset
+            offset += len(line)
+            if not line.strip():
+                continue
+            # The optional header line holds base_style and isn't a character
+            if first:
+                first = False
+                if 'base_style' in json.loads(line):
+                    continue
+            offsets.append(line_offset)
+            # Only lines that mention a weight need to be parsed
+            weights.append(character_weight(json.loads(line)) if b'"weight"' in line else 1.0)
+
+    # All-zero weights express no preference, sampled uniformly like an unweighted file
+    weighted = bool(offsets) and any(w != 1.0 for w in weights) and sum(weights) > 0
+    if weighted:
+        prob, alias = build_alias_table(weights)
+    else:
+        prob, alias = [1.0] * len(offsets), list(range(len(offsets)))
+
+    with open(tmp_path, 'wb') as index:
+        index.write(INDEX_HEADER.pack(INDEX_MAGIC, stat.st_mtime_ns, stat.st_size, len(offsets), int(weighted)))
+        for entry in zip(offsets, weights, prob, alias):
+            index.write(INDEX_ENTRY.pack(*entry))
+
+    os.replace(tmp_path, index_path)
+    return index_path
+
+
+def read_index_header(index_path: str):
+    """(source mtime_ns, source size, count, weighted) from a sidecar index, or None if it is missing or invalid"""
+    try:
+        with open(index_path, 'rb') as f:
+            magic, mtime_ns, size, count, weighted = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+    except (OSError, struct.error):
+        return None
+    if magic != INDEX_MAGIC:
+        return None
+    return (mtime_ns, size, count, bool(weighted))
+
+
+class IndexedCharacters(Sequence):
+    """
+    Read-only sequence of CharacterRecords backed by a JSONL file and its offset index.
+    Also serves as the on-disk alias table for weighted sampling
+    """
+
+    def __init__(self, jsonl_path: str, index_path: str, count: int):
+        self.jsonl_path = jsonl_path
+        self.index_path = index_path
+        self.count = count
+        self._records = OrderedDict()  # index -> CharacterRecord
+        self._weights = None  # every weight, read from the sidecar on first use
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("character index out of range")
+
+        with self._lock:
+            record = self._records.get(index)
+            if record is not None:
+                self._records.move_to_end(index)
+                return record
+
+        # Look up the line offset, then read just that line
+        offset = self._read_entry(index)[0]
+        with open(self.jsonl_path, 'rb') as f:
+            f.seek(offset)
+            record = compile_character(json.loads(f.readline()))
+
+        with self._lock:
+            self._records[index] = record
+            while len(self._records) > MAX_CACHED_RECORDS:
+                self._records.popitem(last=False)
+        return record
+
+    def _read_entry(self, index: int):
+        with open(self.index_path, 'rb') as f:
+            f.seek(INDEX_HEADER.size + index * INDEX_ENTRY.size)
+            return INDEX_ENTRY.unpack(f.read(INDEX_ENTRY.size))
+
+    def entry(self, index: int) -> Tuple[float, float, int]:
+        """(weight, prob, alias) for one character, read from the sidecar"""
+        return self._read_entry(index)[1:]
+
+    def weight(self, index: int) -> float:
+        return self._read_entry(index)[1]
+
+    def all_weights(self) -> Sequence:
+        """Every weight, from one sequential read of the sidecar"""
+        with self._lock:
+            if self._weights is None:
+                with open(self.index_path, 'rb') as f:
+                    f.seek(INDEX_HEADER.size)
+                    data = f.read(self.count * INDEX_ENTRY.size)
+                self._weights = [entry[1] for entry in INDEX_ENTRY.iter_unpack(data)]
+            return self._weights
+
+
+class IndexedCharacterLibrary(NamedTuple):
+    """Same interface as CharacterLibrary, with characters read on demand"""
+    base_prompt: str
+    style_loras: Tuple[Tuple[str, float, float], ...]
+    characters: IndexedCharacters
+    sampler: Optional[IndexedCharacters] = None
+
+
+def open_indexed_library(jsonl_path: str) -> IndexedCharacterLibrary:
+    """Open a JSONL library, (re)building the sidecar index if it is missing or stale"""
+    stat = os.stat(jsonl_path)
+    index_path = index_path_for(jsonl_path)
+    header = read_index_header(index_path)
+    if header is None or header[:2] != (stat.st_mtime_ns, stat.st_size):
+        build_index(jsonl_path)
+        header = read_index_header(index_path)
+
+    # Only the header line is parsed here
+    base_style = {}
+    with open(jsonl_path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                first = json.loads(line)
+                base_style = first.get('base_style', {}) if isinstance(first, dict) else {}
+                break
+
+    base_prompt, style_loras = compile_base_style(base_style)
+    characters = IndexedCharacters(jsonl_path, index_path, header[2])
+    return IndexedCharacterLibrary(base_prompt=base_prompt, style_loras=style_loras, characters=characters,
+                                   sampler=characters if header[3] else None)
+
+
+def convert_json_to_jsonl(json_path: str, jsonl_path: str) -> int:
+    """Convert a README-schema character file (base_style + characters) to an indexed JSONL library"""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    characters = [c for c in data.get('characters', []) if isinstance(c, dict)]
+    tmp_path = f"{jsonl_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({"base_style": data.get('base_style', {})}, ensure_ascii=False) + "\n")
+        for character in characters:
+            f.write(json.dumps(character, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, jsonl_path)
+
+    build_index(jsonl_path)
+    return len(characters)
+
+
+# Compiled libraries keyed by path, validated by (mtime, size)
+MAX_CACHED_LIBRARIES = 8
+_library_cache = OrderedDict()  # path -> (mtime_ns, size, library)
+_lock = threading.Lock()
+
+
+def load_character_library(json_path: str):
+    """
+    Load and compile a character file, reusing the compiled result until the
+    file's mtime or size changes. .jsonl files are opened as indexed libraries
+    """
+    stat = os.stat(json_path)
+    fingerprint = (stat.st_mtime_ns, stat.st_size)
+
+    with _lock:
+        cached = _library_cache.get(json_path)
+        if cached is not None and cached[:2] == fingerprint:
+            _library_cache.move_to_end(json_path)
+            return cached[2]
+
+    if json_path.lower().endswith('.jsonl'):
+        library = open_indexed_library(json_path)
+    else:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            library = compile_library(json.load(f))
+
+    with _lock:
+        _library_cache[json_path] = fingerprint + (library,)
+        _library_cache.move_to_end(json_path)
+        while len(_library_cache) > MAX_CACHED_LIBRARIES:
+            _library_cache.popitem(last=False)
+    return library
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a Characters.json file to an indexed JSONL character library")
+    parser.add_argument("json_file", help="Source character JSON (base_style + characters)")
+    parser.add_argument("jsonl_file", nargs="?", help="Destination .jsonl file (defaults to the source name with .jsonl)")
+    args = parser.parse_args()
+
+    destination = args.jsonl_file or os.path.splitext(args.json_file)[0] + ".jsonl"
+    converted = convert_json_to_jsonl(args.json_file, destination)
+    print(f"Wrote {converted} characters to {destination}")
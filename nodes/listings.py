@@ -0,0 +1,108 @@
+import functools
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import folder_paths
+
+
+# Shared, mtime-validated listings for INPUT_TYPES. Every node class asks this module for
+# LoRA names and input directory contents, so each input directory listing is computed once
+# and only recomputed when the directory changes. LoRA names come from folder_paths' own cache.
+_lock = threading.Lock()
+_listings = {}  # key -> (dir_mtimes, value)
+_input_types_time = defaultdict(float)
+_input_types_calls = defaultdict(int)
+
+
+def _dir_mtimes(directories) -> Tuple[Tuple[str, int], ...]:
+    mtimes = []
+    for directory in directories:
+        try:
+            mtimes.append((directory, os.stat(directory).st_mtime_ns))
+        except OSError:
+            mtimes.append((directory, -1))
+    return tuple(mtimes)
+
+
+def _is_fresh(key) -> bool:
+    entry = _listings.get(key)
+    if entry is None:
+        return False
+    dir_mtimes, _ = entry
+    return _dir_mtimes([directory for directory, _ in dir_mtimes]) == dir_mtimes
+
+
+def _cached(key, compute):
+    """Return the cached listing for key, recomputing it when a tracked directory changed"""
+    with _lock:
+        if _is_fresh(key):
+            return _listings[key][1]
+
+    directories, value = compute()
+    with _lock:
+        _listings[key] = (_dir_mtimes(directories), value)
+    return value
+
+
+def lora_names() -> List[str]:
+    """
+    All LoRA filenames. folder_paths already caches this listing and revalidates it against
+    every directory in the tree, so new subfolders are noticed; a second cache here can't do better
+    """
+    return folder_paths.get_filename_list("loras")
+
+
+def lora_choices() -> List[str]:
+    """LoRA combo choices with the leading "None" entry"""
+    return ["None"] + lora_names()
+
+
+def input_files(extensions: Tuple[str, ...]) -> List[str]:
+    """Sorted filenames in the input directory with one of the given extensions"""
+    def compute():
+        input_dir = folder_paths.get_input_directory()
+        files = []
+        if os.path.isdir(input_dir):
+            with os.scandir(input_dir) as entries:
+                files = sorted(entry.name for entry in entries
+                               if entry.name.lower().endswith(extensions) and entry.is_file())
+        return [input_dir], files
+
+    return _cached(("input_files", extensions), compute)
+
+
+def invalidate():
+    """Drop all cached listings"""
+    with _lock:
+        _listings.clear()
+
+
+def timed_input_types(func):
+    """Decorator for INPUT_TYPES that records how long each node class spends building its inputs"""
+    @functools.wraps(func)
+    def wrapper(cls):
+        start = time.perf_counter()
+        try:
+            return func(cls)
+        finally:
+            with _lock:
+                _input_types_time[cls.__name__] += time.perf_counter() - start
+                _input_types_calls[cls.__name__] += 1
+    return wrapper
+
+
+def input_types_stats() -> Dict[str, Tuple[int, float]]:
+    """node class name -> (INPUT_TYPES calls, total seconds)"""
+    with _lock:
+        return {name: (_input_types_calls[name], _input_types_time[name]) for name in _input_types_calls}
+
+
+def stats_text() -> str:
+    stats = input_types_stats()
+    info = f"INPUT_TYPES timings ({len(_listings)} cached listings):"
+    for name, (calls, seconds) in sorted(stats.items(), key=lambda item: -item[1][1]):
+        info += f"\n{name}: {calls} calls, {seconds * 1000:.1f} ms total"
+    return info
@@ -0,0 +1,296 @@
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import comfy.lora
+import comfy.sd
+import comfy.utils
+import folder_paths
+
+try:
+    from comfy.lora_convert import convert_lora
+except ImportError:  # Older ComfyUI versions don't convert LoRA key formats
+    convert_lora = None
+
+
+# Default byte budget for cached LoRA weights, can be overridden with an env var
+DEFAULT_CACHE_MB = int(os.environ.get("SIMPLE_RANDOM_LORA_CACHE_MB", "2048"))
+
+# Default number of patched (MODEL, CLIP) results kept around
+DEFAULT_PATCHED_ENTRIES = 4
+
+
+def state_dict_nbytes(state_dict: Dict[str, Any]) -> int:
+    """Approximate memory footprint of a loaded LoRA state dict in bytes"""
+    total = 0
+    for tensor in state_dict.values():
+        try:
+            total += tensor.numel() * tensor.element_size()
+        except AttributeError:
+            pass
+    return total
+
+
+class LoraWeightCache:
+    """
+    Process-wide LRU cache of loaded LoRA state dicts bounded by a byte budget
+    """
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = max(0, budget_bytes)
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # lora_path -> (state_dict, nbytes, (mtime_ns, size))
+        self._lock = threading.Lock()
+
+    def get(self, lora_path: str, fingerprint: Optional[Tuple[int, int]] = None) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(lora_path)
+            if entry is not None and entry[2] != fingerprint:
+                # The file was replaced since it was cached
+                self.current_bytes -= self._entries.pop(lora_path)[1]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(lora_path)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, lora_path: str, state_dict: Dict[str, Any], fingerprint: Optional[Tuple[int, int]] = None):
+        nbytes = state_dict_nbytes(state_dict)
+        with self._lock:
+            if lora_path in self._entries:
+                self.current_bytes -= self._entries.pop(lora_path)[1]
+            # Don't cache anything that would never fit into the budget
+            if nbytes > self.budget_bytes:
+                return
+            self._entries[lora_path] = (state_dict, nbytes, fingerprint)
+            self.current_bytes += nbytes
+            self._evict()
+
+    def set_budget(self, budget_bytes: int):
+        with self._lock:
+            self.budget_bytes = max(0, budget_bytes)
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def _evict(self):
+        # Drop least recently used entries until we are back under budget
+        while self._entries and self.current_bytes > self.budget_bytes:
+            _, (_, nbytes, _) = self._entries.popitem(last=False)
+            self.current_bytes -= nbytes
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "budget_bytes": self.budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def stats_text(self) -> str:
+        stats = self.stats()
+        lookups = stats["hits"] + stats["misses"]
+        hit_rate = (100.0 * stats["hits"] / lookups) if lookups else 0.0
+        info = f"LoRA weight cache: {stats['entries']} entries\n"
+        info += f"Size: {stats['bytes'] / (1024 * 1024):.1f} MB of {stats['budget_bytes'] / (1024 * 1024):.1f} MB\n"
+        info += f"Hits: {stats['hits']}, Misses: {stats['misses']} ({hit_rate:.1f}% hit rate)\n"
+        info += f"Evictions: {stats['evictions']}"
+        return info
+
+
+# Shared by every node in this package
+LORA_WEIGHT_CACHE = LoraWeightCache(DEFAULT_CACHE_MB * 1024 * 1024)
+
+
+def file_fingerprint(path: Optional[str]) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of a file, or None if it can't be read"""
+    if path is None:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def lora_fingerprint(lora_name: str) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of a LoRA by name, so caches notice a LoRA that was overwritten"""
+    return file_fingerprint(folder_paths.get_full_path("loras", lora_name))
+
+
+def load_lora_weights(lora_name: str) -> Dict[str, Any]:
+    """Load a LoRA state dict by name, going through the shared weight cache"""
+    lora_path = folder_paths.get_full_path("loras", lora_name)
+    if lora_path is None:
+        raise FileNotFoundError(f"LoRA not found: {lora_name}")
+
+    fingerprint = file_fingerprint(lora_path)
+    lora = LORA_WEIGHT_CACHE.get(lora_path, fingerprint)
+    if lora is None:
+        lora = comfy.utils.load_torch_file(lora_path, safe_load=True)
+        LORA_WEIGHT_CACHE.put(lora_path, lora, fingerprint)
+    return lora
+
+
+def apply_lora(model, clip, lora_name: str, strength_model: float, strength_clip: float):
+    """Same as LoraLoader().load_lora but backed by the shared weight cache"""
+    if strength_model == 0 and strength_clip == 0:
+        return (model, clip)
+
+    lora = load_lora_weights(lora_name)
+    return comfy.sd.load_lora_for_models(model, clip, lora, strength_model, strength_clip)
+
+
+def apply_loras_fused(model, clip, loras: List[Tuple[str, float, float]]):
+    """
+    Apply many LoRAs in a single pass: the key map is built once and the
+    model/clip patchers are cloned once, instead of once per LoRA
+    """
+    loras = [l for l in loras if l[1] != 0 or l[2] != 0]
+    if not loras:
+        return (model, clip)
+
+    # Build the key map once for all LoRAs
+    key_map = {}
+    if model is not None:
+        key_map = comfy.lora.model_lora_keys_unet(model.model, key_map)
+    if clip is not None:
+        key_map = comfy.lora.model_lora_keys_clip(clip.cond_stage_model, key_map)
+
+    new_model = model.clone() if model is not None else None
+    new_clip = clip.clone() if clip is not None else None
+
+    for lora_name, strength_model, strength_clip in loras:
+        lora = load_lora_weights(lora_name)
+        if convert_lora is not None:
+            lora = convert_lora(lora)
+        loaded = comfy.lora.load_lora(lora, key_map)
+
+        if new_model is not None and strength_model != 0:
+            new_model.add_patches(loaded, strength_model)
+        if new_clip is not None and strength_clip != 0:
+            new_clip.add_patches(loaded, strength_clip)
+
+    return (new_model, new_clip)
+
+
+class PatchedModelCache:
+    """
+    Small LRU cache of patched (MODEL, CLIP) outputs keyed by the identity of the
+    incoming model/clip plus the sorted set of applied LoRAs, their strengths and file
+    (mtime, size), so an overwritten LoRA isn't served from an old patch. Base models
+    are only weakly referenced, so switching checkpoints doesn't keep the old ones in memory
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max(0, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (base_model ref, base_clip ref, model, clip)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model, clip, loras: List[Tuple[str, float, float]]):
+        return (id(model), id(clip),
+                tuple(sorted((name, float(sm), float(sc), lora_fingerprint(name)) for name, sm, sc in loras)))
+
+    def _ref(self, key, obj) -> Optional[weakref.ref]:
+        if obj is None:
+            return None
+        entries = self._entries
+        # Drop the entry as soon as its base model/clip is freed, so the patched clones go with it.
+        # dict.pop is atomic, so this is safe from a garbage collection in any thread
+        return weakref.ref(obj, lambda _: entries.pop(key, None))
+
+    @staticmethod
+    def _refers_to(ref: Optional[weakref.ref], obj) -> bool:
+        return ref() is obj if ref is not None else obj is None
+
+    def get(self, model, clip, loras: List[Tuple[str, float, float]]):
+        key = self.make_key(model, clip, loras)
+        with self._lock:
+            entry = self._entries.get(key)
+            # ids can be reused once an object is gone, so check the entry still refers to these objects
+            if entry is None or not self._refers_to(entry[0], model) or not self._refers_to(entry[1], clip):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return (entry[2], entry[3])
+
+    def put(self, model, clip, loras: List[Tuple[str, float, float]], patched_model, patched_clip):
+        key = self.make_key(model, clip, loras)
+        with self._lock:
+            self._entries[key] = (self._ref(key, model), self._ref(key, clip), patched_model, patched_clip)
+            self._entries.move_to_end(key)
+            self._trim()
+
+    def request_entries(self, max_entries: int):
+        """Grow to the largest size any node asked for, so nodes don't trim each other's entries"""
+        with self._lock:
+            self.max_entries = max(self.max_entries, max_entries)
+
+    def set_max_entries(self, max_entries: int):
+        with self._lock:
+            self.max_entries = max(0, max_entries)
+            self._trim()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _trim(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats_text(self) -> str:
+        with self._lock:
+            info = f"Patched model cache: {len(self._entries)} of {self.max_entries} entries\n"
+            info += f"Hits: {self.hits}, Misses: {self.misses}"
+        return info
+
+
+PATCHED_MODEL_CACHE = PatchedModelCache(DEFAULT_PATCHED_ENTRIES)
+
+
+def apply_loras(model, clip, loras: List[Tuple[str, float, float]], fused: bool = True, cache_entries: Optional[int] = None):
+    """
+    Apply a list of (name, model_strength, clip_strength) LoRAs, reusing a previously
+    patched model when the same combination was applied to the same base model.
+    cache_entries is the caller's requested cache size; 0 bypasses the cache
+    """
+    if cache_entries is None:
+        use_cache = PATCHED_MODEL_CACHE.max_entries > 0
+    else:
+        use_cache = cache_entries > 0
+        PATCHED_MODEL_CACHE.request_entries(cache_entries)
+
+    if use_cache:
+        cached = PATCHED_MODEL_CACHE.get(model, clip, loras)
+        if cached is not None:
+            return cached
+
+    if fused:
+        patched_model, patched_clip = apply_loras_fused(model, clip, loras)
+    else:
+        patched_model, patched_clip = model, clip
+        for lora_name, strength_model, strength_clip in loras:
+            patched_model, patched_clip = apply_lora(patched_model, patched_clip, lora_name, strength_model, strength_clip)
+
+    if use_cache:
+        PATCHED_MODEL_CACHE.put(model, clip, loras, patched_model, patched_clip)
+    return (patched_model, patched_clip)
@@ -0,0 +1,217 @@
+import json
+import os
+import struct
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import folder_paths
+
+from .listings import lora_names
+from .safetensors_header import read_safetensors_header
+
+
+# How long the first lookup may wait for a build that has nothing on disk yet
+COLD_START_WAIT = 2.0
+# Minimum time between incremental refreshes
+REFRESH_INTERVAL = 30.0
+# Tags kept per LoRA, most frequent first
+MAX_STORED_TAGS = 50
+# Save progress every this many newly read headers so a long first build isn't lost
+SAVE_EVERY = 200
+INDEX_VERSION = 1
+
+
+def default_index_path() -> str:
+    return os.path.join(folder_paths.get_user_directory(), "simple_random_lora", "lora_metadata_index.json")
+
+
+def triggers_from_metadata(metadata: dict) -> Tuple[str, List[str]]:
+    """(modelspec trigger phrase, training tags by frequency) from a safetensors __metadata__ dict"""
+    trigger = str(metadata.get("modelspec.trigger_phrase") or "").strip()
+
+    totals = Counter()
+    frequency = metadata.get("ss_tag_frequency")
+    if isinstance(frequency, str):
+        try:
+            frequency = json.loads(frequency)
+        except ValueError:
+            frequency = None
+    if isinstance(frequency, dict):
+        # kohya stores {dataset dir: {tag: count}}, summed over every dataset
+        for tags in frequency.values():
+            if not isinstance(tags, dict):
+                continue
+            for tag, count in tags.items():
+                tag = str(tag).strip()
+                if tag and isinstance(count, (int, float)):
+                    totals[tag] += count
+    tags = [tag for tag, _ in sorted(totals.items(), key=lambda item: (-item[1], item[0]))[:MAX_STORED_TAGS]]
+    return trigger, tags
+
+
+class LoraMetadataIndex:
+    """
+    Persistent index of trigger phrases and training tags of every LoRA, read from
+    safetensors headers by a background thread. Refreshes only re-read files whose
+    (mtime, size) changed, and lookups are dictionary reads that never touch the LoRA files
+    """
+
+    def __init__(self, index_path: Optional[str] = None):
+        self.index_path = index_path
+        self._lock = threading.Lock()
+        self._entries = None  # lora name -> {"mtime_ns", "size", "trigger", "tags"}, loaded on first use
+        self._thread = None
+        self._last_refresh = None  # time.monotonic() of the last finished refresh
+        self._complete = False  # a full refresh has finished at least once
+        self._total = 0  # LoRAs in the folders at the last refresh
+        self._generation = 0  # bumped whenever lookups may give different answers
+
+    def _path(self) -> str:
+        if self.index_path is None:
+            self.index_path = default_index_path()
+        return self.index_path
+
+    def _load(self) -> Dict[str, dict]:
+        if self._entries is not None:
+            return self._entries
+        try:
+            with open(self._path(), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            entries = data.get("loras", {}) if isinstance(data, dict) and data.get("version") == INDEX_VERSION else {}
+        except (OSError, ValueError):
+            entries = {}
+        self._entries = entries
+        self._complete = bool(entries)
+        return entries
+
+    def _save(self, entries: Dict[str, dict]):
+        """Write the index atomically so a crash never leaves a half-written file"""
+        path = self._path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": INDEX_VERSION, "loras": entries}, f)
+        os.replace(tmp_path, path)
+
+    def refresh(self, force: bool = False) -> Optional[threading.Thread]:
+        """Start a background refresh unless one is running or the last one is recent"""
+        with self._lock:
+            self._load()
+            if self._thread is not None:
+                return self._thread
+            if not force and self._last_refresh is not None and time.monotonic() - self._last_refresh < REFRESH_INTERVAL:
+                return None
+            thread = threading.Thread(target=self._refresh, daemon=True, name="lora-metadata-index")
+            self._thread = thread
+        thread.start()
+        return thread
+
+    def _refresh(self):
+        try:
+            self._update()
+        except Exception as e:
+            print(f"Error indexing LoRA metadata: {str(e)}")
+        finally:
+            with self._lock:
+                self._thread = None
+                self._last_refresh = time.monotonic()
+
+    def _update(self):
+        names = lora_names()
+        with self._lock:
+            entries = dict(self._entries)
+            self._total = len(names)
+
+        changed = 0
+        unsaved = 0
+        for name in names:
+            path = folder_paths.get_full_path("loras", name)
+            if path is None:
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entry = entries.get(name)
+            if entry is not None and (entry.get("mtime_ns"), entry.get("size")) == (stat.st_mtime_ns, stat.st_size):
+                continue
+
+            trigger, tags = "", []
+            if path.lower().endswith(".safetensors"):
+                try:
+                    _, metadata = read_safetensors_header(path)
+                    trigger, tags = triggers_from_metadata(metadata)
+                except (OSError, ValueError, struct.error):
+                    pass
+            entries[name] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "trigger": trigger, "tags": tags}
+            changed += 1
+            unsaved += 1
+
+            if unsaved >= SAVE_EVERY:
+                # Publish progress so lookups during a long first build already see these
+                with self._lock:
+                    self._entries = dict(entries)
+                    self._generation += 1
+                self._save(entries)
+                unsaved = 0
+
+        present = set(names)
+        for name in [name for name in entries if name not in present]:
+            del entries[name]
+            changed += 1
+
+        with self._lock:
+            if changed or not self._complete:
+                self._generation += 1
+            self._entries = entries
+            self._complete = True
+        if changed:
+            self._save(entries)
+
+    def generation(self) -> int:
+        """Changes whenever the index gains or updates entries or finishes building"""
+        with self._lock:
+            return self._generation
+
+    def trigger_words(self, lora_name: str, top_n: int) -> str:
+        """
+        Trigger phrase and most frequent training tags of a LoRA, top_n in total, joined by
+        ", ". Empty when the LoRA has no such metadata or isn't indexed yet
+        """
+        if top_n <= 0:
+            return ""
+        with self._lock:
+            entry = self._load().get(lora_name)
+        if entry is None:
+            return ""
+
+        words = []
+        seen = set()
+        for word in [w.strip() for w in entry.get("trigger", "").split(',')] + entry.get("tags", []):
+            if word and word not in seen:
+                seen.add(word)
+                words.append(word)
+        return ', '.join(words[:top_n])
+
+    def prepare(self) -> str:
+        """
+        Start a refresh if one is due and return a status line. Before the first build has
+        anything on disk, waits up to COLD_START_WAIT seconds for it
+        """
+        thread = self.refresh()
+        with self._lock:
+            complete = self._complete
+        if not complete and thread is not None:
+            thread.join(COLD_START_WAIT)
+
+        with self._lock:
+            indexed = len(self._entries)
+            if self._complete:
+                return f"Metadata index: {indexed} LoRAs"
+            return f"Metadata index: building ({indexed} of {self._total} LoRAs so far)"
+
+
+# Shared by every LoRA node
+LORA_METADATA_INDEX = LoraMetadataIndex()
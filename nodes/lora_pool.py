@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+import folder_paths
+
+
+# Same defaults as the per-slot widgets
+DEFAULT_MIN_STR = 0.5
+DEFAULT_MAX_STR = 1.0
+
+POOL_FILE_EXTENSIONS = ('.txt', '.json', '.pool')
+
+POOL_SPEC_INPUT = ("STRING", {
+    "multiline": True,
+    "default": "# name | min_str | max_str | trigger words | weight\n",
+    "tooltip": "One LoRA per line as 'name | min_str | max_str | trigger words | weight', "
+               "a JSON list of {name, min_str, max_str, trigger_words, weight}, "
+               "or a path to a .txt/.json/.pool file inside the input directory"
+})
+
+# Parsed pools keyed by content hash, and file contents keyed by path
+MAX_CACHED_POOLS = 64
+_pool_cache = OrderedDict()  # sha1 -> tuple of lora configs
+_file_cache = {}  # path -> (mtime_ns, size, text)
+_lock = threading.Lock()
+
+
+def normalize_trigger_words(trigger_words: str) -> str:
+    return ', '.join([s.strip() for s in (trigger_words or "").strip().split(',') if s.strip()])
+
+
+def resolve_pool_file(spec: str):
+    """
+    Return the full path if the spec is a single line pointing at a pool file, else None.
+    Pool files must be inside the input directory, after resolving symlinks and "..";
+    a path that leads anywhere else, or to a file that doesn't exist, raises ValueError
+    """
+    candidate = spec.strip()
+    if not candidate or '\n' in candidate or not candidate.lower().endswith(POOL_FILE_EXTENSIONS):
+        return None
+    input_dir = os.path.realpath(folder_paths.get_input_directory())
+    full_path = os.path.realpath(os.path.join(input_dir, candidate))
+    if os.path.commonpath([input_dir, full_path]) != input_dir:
+        raise ValueError(f"Pool file must be inside the input directory: {candidate}")
+    if not os.path.isfile(full_path):
+        # Otherwise the path would be parsed as a pool holding one LoRA named after the file
+        raise ValueError(f"Pool file not found in the input directory: {candidate}")
+    return full_path
+
+
+def pool_spec_fingerprint(spec: str):
+    """Cheap change marker for a pool spec, used by IS_CHANGED so edited pool files re-execute"""
+    try:
+        pool_file = resolve_pool_file(spec or "")
+    except ValueError:
+        # Reported when the node runs
+        return spec
+    if pool_file is None:
+        return spec
+    stat = os.stat(pool_file)
+    return f"{pool_file}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def read_pool_file(path: str) -> str:
+    """Read a pool file, reusing the previous contents while mtime and size are unchanged"""
+    stat = os.stat(path)
+    with _lock:
+        cached = _file_cache.get(path)
+        if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    with _lock:
+        _file_cache[path] = (stat.st_mtime_ns, stat.st_size, text)
+    return text
+
+
+def _make_config(name: Any, min_str: Any, max_str: Any, trigger_words: Any, weight: Any, where: str) -> Dict[str, Any]:
+    try:
+        min_str = float(min_str)
+        max_str = float(max_str)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid strength in pool spec {where}")
+    try:
+        weight = max(0.0, float(weight))
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid weight in pool spec {where}")
+    return {"name": str(name).strip(), "min_str": min_str, "max_str": max_str,
+            "trigger_words": normalize_trigger_words(str(trigger_words or "")), "weight": weight}
+
+
+def _parse_json_pool(text: str) -> List[Dict[str, Any]]:
+    data = json.loads(text)
+    if isinstance(data, dict):
+        data = data.get('loras', [])
+    if not isinstance(data, list):
+        raise ValueError("JSON pool spec must be a list or an object with a 'loras' list")
+
+    configs = []
+    for index, entry in enumerate(data):
+        where = f"entry {index + 1}"
+        if isinstance(entry, str):
+            configs.append(_make_config(entry, DEFAULT_MIN_STR, DEFAULT_MAX_STR, "", 1.0, where))
+        elif isinstance(entry, dict) and entry.get('name'):
+            # A single 'strength' means a fixed strength
+            strength = entry.get('strength')
+            min_str = entry.get('min_str', entry.get('min', strength if strength is not None else DEFAULT_MIN_STR))
+            max_str = entry.get('max_str', entry.get('max', strength if strength is not None else DEFAULT_MAX_STR))
+            trigger_words = entry.get('trigger_words', entry.get('trigger', ""))
+            if isinstance(trigger_words, list):
+                trigger_words = ', '.join(str(t) for t in trigger_words)
+            configs.append(_make_config(entry['name'], min_str, max_str, trigger_words, entry.get('weight', 1.0), where))
+        else:
+            raise ValueError(f"Invalid pool spec {where}: expected a name or an object with 'name'")
+    return configs
+
+
+def _parse_text_pool(text: str) -> List[Dict[str, Any]]:
+    configs = []
+    for line_number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+
+        fields = [field.strip() for field in line.split('|')]
+        name = fields[0]
+        min_str = fields[1] if len(fields) > 1 and fields[1] else DEFAULT_MIN_STR
+        # A single strength means a fixed strength
+        max_str = fields[2] if len(fields) > 2 and fields[2] else (min_str if len(fields) > 1 and fields[1] else DEFAULT_MAX_STR)
+        trigger_words = fields[3] if len(fields) > 3 else ""
+        weight = fields[4] if len(fields) > 4 and fields[4] else 1.0
+        configs.append(_make_config(name, min_str, max_str, trigger_words, weight, f"line {line_number}"))
+    return configs
+
+
+def parse_pool_spec(spec: str) -> Tuple[Dict[str, Any], ...]:
+    """
+    Parse a pool spec (text, JSON or pool file path) into lora configs.
+    Results are cached by content hash, so unchanged pools are only parsed once
+    """
+    pool_file = resolve_pool_file(spec or "")
+    text = read_pool_file(pool_file) if pool_file else (spec or "")
+
+    digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+    with _lock:
+        cached = _pool_cache.get(digest)
+        if cached is not None:
+            _pool_cache.move_to_end(digest)
+            return cached
+
+    stripped = text.lstrip()
+    if stripped.startswith('[') or stripped.startswith('{'):
+        parsed = _parse_json_pool(text)
+    else:
+        parsed = _parse_text_pool(text)
+
+    # Drop "None" entries. The first entry of a LoRA sets its strengths, repeats add to its weight
+    # (same as the widget nodes)
+    configs = []
+    configs_by_name = {}
+    for config in parsed:
+        if not config['name'] or config['name'] == "None":
+            continue
+        if config['name'] in configs_by_name:
+            configs_by_name[config['name']]['weight'] += config['weight']
+            continue
+        configs_by_name[config['name']] = config
+        configs.append(config)
+    configs = tuple(configs)
+
+    with _lock:
+        _pool_cache[digest] = configs
+        while len(_pool_cache) > MAX_CACHED_POOLS:
+            _pool_cache.popitem(last=False)
+    return configs
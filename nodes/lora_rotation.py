@@ -0,0 +1,119 @@
+import hashlib
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+from .rng import FeistelPermutation
+from .state_file import JsonStateFile
+
+
+# Shuffle-bag rotation: every LoRA of a pool is drawn once before any repeats. The bag for
+# a pool is a seeded permutation per epoch, so its whole state is (salt, epoch, position),
+# plus the few LoRAs held back when a draw spans a refill, and a draw of k LoRAs costs
+# O(k) permutation lookups. State is persisted to a small JSON file in the user directory
+# so rotations survive restarts, and re-read under a file lock before every draw so
+# several workers share one rotation.
+MAX_BAGS = 256
+MAX_CACHED_POOLS = 64
+
+_lock = threading.Lock()
+_state = JsonStateFile("lora_rotation.json")  # pool hash -> {"salt", "epoch", "pos", "deferred", "updated"}
+_pools = OrderedDict()  # tuple of names -> (pool hash, canonical order)
+
+
+def pool_hash(names) -> str:
+    """Content hash of a pool, independent of slot order"""
+    return hashlib.sha1("\n".join(sorted(names)).encode("utf-8")).hexdigest()
+
+
+def _pool(names: List[str]) -> Tuple[str, List[int]]:
+    """Pool hash and canonical slot order, sorted once per pool rather than on every draw"""
+    names = tuple(names)
+    with _lock:
+        cached = _pools.get(names)
+        if cached is not None:
+            _pools.move_to_end(names)
+            return cached
+    # Canonical order so the bag doesn't depend on which slot a LoRA is in
+    cached = (pool_hash(names), sorted(range(len(names)), key=lambda i: names[i]))
+    with _lock:
+        _pools[names] = cached
+        while len(_pools) > MAX_CACHED_POOLS:
+            _pools.popitem(last=False)
+    return cached
+
+
+def draw_from_bag(items: List, names: List[str], count: int,
+                  fits: Optional[Callable[[object], bool]] = None) -> Tuple[List, str]:
+    """
+    Next count items from the pool's shuffle bag, refilling it with a new shuffle when it
+    runs out. items and names are parallel; the bag is keyed by the set of names. fits,
+    if given, is asked about each candidate in bag order (e.g. a memory budget); candidates
+    it rejects stay in the bag for later draws
+    """
+    n = len(items)
+    count = min(count, n)
+    if count <= 0:
+        return [], ""
+
+    key, order = _pool(names)
+
+    with _state.update() as bags:
+        bag = bags.get(key)
+        if bag is None:
+            bag = {"salt": random.SystemRandom().getrandbits(63), "epoch": 0, "pos": 0}
+
+        chosen = []
+        seen = set()
+        held = []  # Candidates not used by this draw, first in line for the next one
+
+        def offer(index):
+            if index in seen:
+                # A draw that spans a refill can't pick the same LoRA twice, keep it for the next draw
+                if index not in held:
+                    held.append(index)
+            elif fits is None or fits(items[index]):
+                seen.add(index)
+                chosen.append(items[index])
+            else:
+                seen.add(index)
+                held.append(index)
+
+        # LoRAs held back by an earlier draw come first
+        if bag.get("deferred"):
+            index_by_name = {name: i for i, name in enumerate(names)}
+            for name in bag["deferred"]:
+                index = index_by_name.get(name)
+                if index is None:
+                    continue
+                if len(chosen) < count:
+                    offer(index)
+                elif index not in held:
+                    held.append(index)
+
+        permutation: Optional[FeistelPermutation] = None
+        walked = 0
+        # The rest of this pass plus one full pass holds every LoRA, so don't walk further
+        while len(chosen) < count and walked < 2 * n:
+            if bag["pos"] >= n:
+                # Bag is empty, refill with the next shuffle
+                bag["epoch"] += 1
+                bag["pos"] = 0
+                permutation = None
+            if permutation is None:
+                permutation = FeistelPermutation(n, bag["salt"], f"lora_rotation:{bag['epoch']}")
+            offer(order[permutation[bag["pos"]]])
+            bag["pos"] += 1
+            walked += 1
+        bag["deferred"] = [names[i] for i in held]
+
+        bag["updated"] = time.time()
+        bags[key] = bag
+        if len(bags) > MAX_BAGS:
+            for stale in sorted(bags, key=lambda k: bags[k].get("updated", 0))[:len(bags) - MAX_BAGS]:
+                del bags[stale]
+        info = f"Rotation: pass {bag['epoch'] + 1}, {bag['pos']} of {n} used"
+
+    return chosen, info
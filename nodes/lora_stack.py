@@ -0,0 +1,125 @@
+from typing import Iterable, List, Optional, Tuple
+
+
+# How a LoRA that is already in a stack combines with a new entry of the same name.
+# "keep" leaves duplicates as separate entries like plain list stacks always did. Applying
+# one LoRA twice adds its patches, so "sum" gives the same result while loading the file once.
+MERGE_POLICIES = ["keep", "first", "max", "sum", "last"]
+
+MERGE_POLICY_INPUT_TOOLTIP = ("How to combine a LoRA that is already in the stack: keep adds it again as its "
+                              "own entry, first keeps the existing strengths, max keeps the larger, sum adds "
+                              "them, last replaces them")
+
+
+def merge_policy_input(default: str):
+    return (MERGE_POLICIES, {"default": default, "tooltip": MERGE_POLICY_INPUT_TOOLTIP})
+
+
+def _combine(policy: str, old: Tuple, new: Tuple) -> Tuple:
+    if policy == "first":
+        return old
+    if policy == "last":
+        return new
+    if policy == "max":
+        return (old[0], max(old[1], new[1]), max(old[2], new[2]))
+    if policy == "sum":
+        return (old[0], old[1] + new[1], old[2] + new[2])
+    raise ValueError(f"Unknown LoRA merge policy: {policy}")
+
+
+def _entry(lora) -> Optional[Tuple]:
+    """(name, model_weight, clip_weight) from a stack entry, or None for "None" placeholders"""
+    if len(lora) < 2 or not lora[0] or lora[0] == "None":
+        return None
+    clip_weight = lora[2] if len(lora) > 2 else lora[1]
+    return (lora[0], lora[1], clip_weight)
+
+
+class LoraStack(list):
+    """
+    Builder for LORA_STACK lists of (lora_name, model_weight, clip_weight) tuples with a
+    name index, so adding a LoRA that is already present is O(1) and combines strengths
+    by policy instead of appending a duplicate. Only append/extend know about the index;
+    nodes output stack_output(stack), a plain list, so downstream nodes never see this class
+    """
+
+    def __init__(self, entries: Iterable = (), policy: str = "first"):
+        super().__init__()
+        if policy not in MERGE_POLICIES:
+            raise ValueError(f"Unknown LoRA merge policy: {policy}")
+        self.policy = policy
+        self._index = {}  # lora name -> position of its first entry
+        self._length = 0  # length the index was built for
+        self.extend(entries)
+
+    @classmethod
+    def from_upstream(cls, lora_stack, policy: str = "first") -> "LoraStack":
+        """
+        New stack starting with an incoming LORA_STACK. A LoraStack is copied at C speed
+        along with its index; any other list is filtered and indexed once
+        """
+        if isinstance(lora_stack, LoraStack) and lora_stack._is_synced():
+            stack = cls.__new__(cls)
+            list.__init__(stack, lora_stack)
+            stack.policy = policy
+            stack._index = dict(lora_stack._index)
+            stack._length = lora_stack._length
+            return stack
+        return cls(lora_stack or (), policy)
+
+    def _is_synced(self) -> bool:
+        # Someone may have mutated this through plain list methods
+        return self._length == len(self)
+
+    def _reindex(self):
+        entries = list(self)
+        self.clear()
+        self._index = {}
+        self._length = 0
+        self.extend(entries)
+
+    def append(self, lora):
+        entry = _entry(lora)
+        if entry is None:
+            return
+        if not self._is_synced():
+            self._reindex()
+        position = self._index.get(entry[0])
+        if position is None or self.policy == "keep":
+            self._index.setdefault(entry[0], len(self))
+            super().append(entry)
+            self._length += 1
+        else:
+            self[position] = _combine(self.policy, self[position], entry)
+
+    def extend(self, loras):
+        for lora in loras:
+            self.append(lora)
+
+    def add(self, name: str, model_weight: float, clip_weight: float):
+        self.append((name, model_weight, clip_weight))
+
+    def __iadd__(self, loras):
+        self.extend(loras)
+        return self
+
+    def __reduce__(self):
+        # Rebuild through __init__ so copies and pickles get a fresh index
+        return (self.__class__, (list(self), self.policy))
+
+    def has(self, name: str) -> bool:
+        if not self._is_synced():
+            self._reindex()
+        return name in self._index
+
+
+def stack_output(stack) -> List[Tuple]:
+    """Plain list for a LORA_STACK output, so downstream nodes get ordinary list semantics"""
+    return list(stack)
+
+
+def merged_stack(lora_stack, entries: Iterable, policy: str = "first") -> List[Tuple]:
+    """Incoming stack plus entries, merged by policy, as a LORA_STACK output"""
+    stack = LoraStack.from_upstream(lora_stack, policy)
+    stack.extend(entries)
+    return stack_output(stack)
@@ -1,10 +1,35 @@
-import json
 import os
-import random
 import folder_paths
+from .rng import node_rng
+from .character_library import coverage_characters, load_character_library, select_characters
+from .listings import input_files, timed_input_types
+from .lora_stack import LoraStack, merge_policy_input, stack_output
+from .safetensors_header import preflight_architecture, preflight_input, preflight_stack, problems_text
 from typing import Dict, List, Tuple, Any
 
 
+COVERAGE_INPUTS = {
+    "coverage_mode": ("BOOLEAN", {"default": False,
+                                  "tooltip": "Step through every combination of characters once before repeating, driven by loop_count (ignores randomize_seed and weights)"}),
+    "loop_count": ("INT", {"default": 0, "min": 0, "max": 0xffffffffffffffff, "step": 1,
+                           "tooltip": "Increment this to go to the next combination in coverage mode"}),
+    "shuffle_combinations": ("BOOLEAN", {"default": True,
+                                         "tooltip": "In coverage mode, visit combinations in a seeded random order instead of sequentially"}),
+}
+
+
+def pick_characters(library, rng, seed, num_characters, allow_duplicates, coverage_mode, loop_count,
+                    shuffle_combinations):
+    """Selected records plus a line for debug_info describing how they were picked"""
+    if coverage_mode:
+        selected, position, total = coverage_characters(
+            library, seed, loop_count, num_characters, allow_duplicates, shuffle_combinations)
+        order = "shuffled" if shuffle_combinations else "sequential"
+        return selected, f"Coverage: combination {position + 1} of {total} ({order})\n"
+    # Select random characters, weighted by 'weight' when the library has weights
+    return select_characters(library, rng, num_characters, allow_duplicates), ""
+
+
 class MultiCharacterRandomizer:
     """
     Multi-character randomizer - randomly selects N characters and outputs prompts separately
@@ -12,11 +37,9 @@ class MultiCharacterRandomizer:
     """
     
     @classmethod
+    @timed_input_types
     def INPUT_TYPES(cls):
-        input_dir = folder_paths.get_input_directory()
-        json_files = []
-        if os.path.exists(input_dir):
-            json_files = [f for f in os.listdir(input_dir) if f.endswith('.json')]
+        json_files = input_files(('.json', '.jsonl'))
         
         if not json_files:
             json_files = ["No JSON files found"]
@@ -37,7 +60,11 @@ class MultiCharacterRandomizer:
             },
             "optional": {
                 "lora_stack": ("LORA_STACK",),
-            }
+                **COVERAGE_INPUTS,
+                "lora_merge": merge_policy_input("first"),
+                "lora_preflight": preflight_input("off"),
+            },
+            "hidden": {"unique_id": "UNIQUE_ID"},
         }
     
     RETURN_TYPES = ("STRING", "STRING", "STRING", "STRING", "STRING", "LORA_STACK", "STRING", "STRING")
@@ -47,48 +74,42 @@ class MultiCharacterRandomizer:
     CATEGORY = "Character Loader"
     
     def randomize_characters(self, json_file, num_characters, seed, randomize_seed, 
-                           allow_duplicates, character_separator, lora_stack=None):
+                           allow_duplicates, character_separator, lora_stack=None,
+                           coverage_mode=False, loop_count=0, shuffle_combinations=True, lora_merge="first",
+                           lora_preflight="off", unique_id=None):
         
         if json_file == "No JSON files found":
             return ("Error: No JSON files found", "", "", "", "Error", [], "Error", "No JSON files in input directory")
         
         try:
-            # Set random seed
-            if randomize_seed:
-                random.seed()
-            else:
-                random.seed(seed)
+            # Private random stream for this node, fresh entropy when randomize_seed is set
+            rng = node_rng("MultiCharacterRandomizer", seed, randomize_seed, unique_id)
             
-            # Load JSON data
+            # Load the compiled character library (cached until the file changes)
             json_path = os.path.join(folder_paths.get_input_directory(), json_file)
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            library = load_character_library(json_path)
             
-            characters = data.get('characters', [])
+            characters = library.characters
             if not characters:
                 return ("Error: No characters found", "", "", "", "Error", [], "Error", "No characters in JSON")
             
-            base_style = data.get('base_style', {})
-            
             # Limit num_characters to available characters if duplicates not allowed
             if not allow_duplicates:
                 num_characters = min(num_characters, len(characters))
             
-            # Select random characters
-            if allow_duplicates:
-                selected_characters = random.choices(characters, k=num_characters)
-            else:
-                selected_characters = random.sample(characters, num_characters)
+            selected_characters, coverage_info = pick_characters(
+                library, rng, seed, num_characters, allow_duplicates, coverage_mode, loop_count,
+                shuffle_combinations)
             
             # Get base prompt
-            base_prompt = base_style.get('prompt', '').strip()
+            base_prompt = library.base_prompt
             
             # Get individual character prompts (up to 3 for the outputs)
             char_prompts = ["", "", ""]  # Initialize with empty strings
             character_prompt_parts = []
             
             for i, character in enumerate(selected_characters):
-                char_prompt = character.get('prompt', '').strip()
+                char_prompt = character.prompt
                 character_prompt_parts.append(char_prompt)
                 
                 # Store in individual outputs (up to 3)
@@ -110,42 +131,24 @@ class MultiCharacterRandomizer:
             
             combined_prompt = ', '.join(filter(None, prompt_parts))
             
-            # Build LoRA stack - Initialize the list (same as CR_LoRAStack)
-            lora_list = list()
-            
-            # Add incoming LoRA stack if provided
-            if lora_stack is not None:
-                lora_list.extend([l for l in lora_stack if l[0] != "None"])
+            # Build LoRA stack, starting from the incoming stack if provided ("None" entries are dropped)
+            lora_list = LoraStack.from_upstream(lora_stack, "keep")
             
             # Add style LoRA
-            style_lora = base_style.get('style_lora')
-            if style_lora and style_lora != "None":
-                style_strength = base_style.get('style_strength', 1.0)
-                lora_list.extend([(style_lora, style_strength, style_strength)])
+            lora_list.extend(library.style_loras)
             
-            # Add character LoRAs for all selected characters
+            # Add character LoRAs and additional character LoRAs for all selected characters.
+            # The incoming and style LoRAs are kept as they are; a character LoRA that is already
+            # in the stack is combined by lora_merge (O(1) lookup), so "first" skips it like before
+            lora_list.policy = lora_merge
             for character in selected_characters:
-                char_lora = character.get('lora')
-                if char_lora and char_lora != "None":
-                    char_strength = character.get('lora_strength', 1.0)
-                    # Check for duplicates in lora_list to avoid adding the same LoRA multiple times
-                    if not any(lora[0] == char_lora for lora in lora_list):
-                        lora_list.extend([(char_lora, char_strength, char_strength)])
-                
-                # Add additional character LoRAs
-                additional_loras = character.get('additional_loras', [])
-                for lora_data in additional_loras:
-                    if isinstance(lora_data, dict):
-                        lora_name = lora_data.get('name')
-                        if lora_name and lora_name != "None":
-                            model_strength = lora_data.get('model_strength', 1.0)
-                            clip_strength = lora_data.get('clip_strength', 1.0)
-                            # Check for duplicates
-                            if not any(lora[0] == lora_name for lora in lora_list):
-                                lora_list.extend([(lora_name, model_strength, clip_strength)])
+                lora_list.extend(character.loras)
+            
+            # Drop LoRAs whose files are missing or don't match the base model
+            lora_list, problems = preflight_stack(lora_list, preflight_architecture(lora_preflight))
             
             # Generate output strings
-            selected_character_names = [char.get('name', 'Unnamed') for char in selected_characters]
+            selected_character_names = [char.name if char.name is not None else 'Unnamed' for char in selected_characters]
             selected_characters_str = ', '.join(selected_character_names)
             
             # Debug information
@@ -156,11 +159,14 @@ class MultiCharacterRandomizer:
                 if i < len(selected_characters):
                     debug_info += f"Char{i+1} prompt: {char_prompt}\n"
             debug_info += f"Allow duplicates: {allow_duplicates}\n"
-            debug_info += f"Seed: {seed} (randomized: {randomize_seed})\n"
+            debug_info += coverage_info
+            debug_info += f"Seed: {seed} (randomized: {randomize_seed and not coverage_mode})\n"
             debug_info += f"Total LoRAs in stack: {len(lora_list)}"
+            if problems:
+                debug_info += f"\n{problems_text(problems)}"
             
             return (base_prompt, char_prompts[0], char_prompts[1], char_prompts[2], 
-                   combined_prompt, lora_list, selected_characters_str, debug_info)
+                   combined_prompt, stack_output(lora_list), selected_characters_str, debug_info)
             
         except Exception as e:
             error_msg = f"Error: {str(e)}"
@@ -168,6 +174,10 @@ class MultiCharacterRandomizer:
     
     @classmethod
     def IS_CHANGED(cls, **kwargs):
+        # Coverage mode is deterministic in loop_count, so it never forces re-execution
+        if kwargs.get("coverage_mode", False):
+            return (kwargs.get("seed", 0), kwargs.get("loop_count", 0), kwargs.get("num_characters", 2),
+                    kwargs.get("allow_duplicates", False), kwargs.get("shuffle_combinations", True))
         # Force re-execution when randomize_seed is True or when other parameters change
         if kwargs.get("randomize_seed", False):
             return float("NaN")
@@ -180,11 +190,9 @@ class MultiCharacterMixer:
     """
     
     @classmethod
+    @timed_input_types
     def INPUT_TYPES(cls):
-        input_dir = folder_paths.get_input_directory()
-        json_files = []
-        if os.path.exists(input_dir):
-            json_files = [f for f in os.listdir(input_dir) if f.endswith('.json')]
+        json_files = input_files(('.json', '.jsonl'))
         
         if not json_files:
             json_files = ["No JSON files found"]
@@ -203,7 +211,11 @@ class MultiCharacterMixer:
             },
             "optional": {
                 "lora_stack": ("LORA_STACK",),
-            }
+                **COVERAGE_INPUTS,
+                "lora_merge": merge_policy_input("first"),
+                "lora_preflight": preflight_input("off"),
+            },
+            "hidden": {"unique_id": "UNIQUE_ID"},
         }
     
     RETURN_TYPES = ("STRING", "STRING", "LORA_STACK", "STRING", "STRING")
@@ -213,47 +225,40 @@ class MultiCharacterMixer:
     CATEGORY = "Character Loader"
     
     def mix_characters(self, json_file, num_characters, seed, randomize_seed, 
-                      allow_duplicates, lora_stack=None):
+                      allow_duplicates, lora_stack=None, coverage_mode=False, loop_count=0,
+                      shuffle_combinations=True, lora_merge="first", lora_preflight="off", unique_id=None):
         
         if json_file == "No JSON files found":
             return ("Error: No JSON files found", "Error", [], "Error", "No JSON files in input directory")
         
         try:
-            # Set random seed
-            if randomize_seed:
-                random.seed()
-            else:
-                random.seed(seed)
+            # Private random stream for this node, fresh entropy when randomize_seed is set
+            rng = node_rng("MultiCharacterMixer", seed, randomize_seed, unique_id)
             
-            # Load JSON data
+            # Load the compiled character library (cached until the file changes)
             json_path = os.path.join(folder_paths.get_input_directory(), json_file)
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            library = load_character_library(json_path)
             
-            characters = data.get('characters', [])
+            characters = library.characters
             if not characters:
                 return ("Error: No characters found", "Error", [], "Error", "No characters in JSON")
             
-            base_style = data.get('base_style', {})
-            
             # Limit num_characters to available characters if duplicates not allowed
             if not allow_duplicates:
                 num_characters = min(num_characters, len(characters))
             
-            # Select random characters
-            if allow_duplicates:
-                selected_characters = random.choices(characters, k=num_characters)
-            else:
-                selected_characters = random.sample(characters, num_characters)
+            selected_characters, coverage_info = pick_characters(
+                library, rng, seed, num_characters, allow_duplicates, coverage_mode, loop_count,
+                shuffle_combinations)
             
             # Get base prompt
-            base_prompt = base_style.get('prompt', '').strip()
+            base_prompt = library.base_prompt
             
             # Get all character prompts as individual lines
             character_prompts_lines = []
             for i, character in enumerate(selected_characters):
-                char_name = character.get('name', f'Character_{i+1}')
-                char_prompt = character.get('prompt', '').strip()
+                char_name = character.name if character.name is not None else f'Character_{i+1}'
+                char_prompt = character.prompt
                 if char_prompt:
                     character_prompts_lines.append(f"{char_name}: {char_prompt}")
                 else:
@@ -261,42 +266,24 @@ class MultiCharacterMixer:
             
             all_character_prompts = '\n'.join(character_prompts_lines)
             
-            # Build LoRA stack
-            lora_list = list()
-            
-            # Add incoming LoRA stack if provided
-            if lora_stack is not None:
-                lora_list.extend([l for l in lora_stack if l[0] != "None"])
+            # Build LoRA stack, starting from the incoming stack if provided ("None" entries are dropped)
+            lora_list = LoraStack.from_upstream(lora_stack, "keep")
             
             # Add style LoRA
-            style_lora = base_style.get('style_lora')
-            if style_lora and style_lora != "None":
-                style_strength = base_style.get('style_strength', 1.0)
-                lora_list.extend([(style_lora, style_strength, style_strength)])
+            lora_list.extend(library.style_loras)
             
-            # Add character LoRAs for all selected characters
+            # Add character LoRAs and additional character LoRAs for all selected characters.
+            # The incoming and style LoRAs are kept as they are; a character LoRA that is already
+            # in the stack is combined by lora_merge (O(1) lookup), so "first" skips it like before
+            lora_list.policy = lora_merge
             for character in selected_characters:
-                char_lora = character.get('lora')
-                if char_lora and char_lora != "None":
-                    char_strength = character.get('lora_strength', 1.0)
-                    # Check for duplicates in lora_list to avoid adding the same LoRA multiple times
-                    if not any(lora[0] == char_lora for lora in lora_list):
-                        lora_list.extend([(char_lora, char_strength, char_strength)])
-                
-                # Add additional character LoRAs
-                additional_loras = character.get('additional_loras', [])
-                for lora_data in additional_loras:
-                    if isinstance(lora_data, dict):
-                        lora_name = lora_data.get('name')
-                        if lora_name and lora_name != "None":
-                            model_strength = lora_data.get('model_strength', 1.0)
-                            clip_strength = lora_data.get('clip_strength', 1.0)
-                            # Check for duplicates
-                            if not any(lora[0] == lora_name for lora in lora_list):
-                                lora_list.extend([(lora_name, model_strength, clip_strength)])
+                lora_list.extend(character.loras)
+            
+            # Drop LoRAs whose files are missing or don't match the base model
+            lora_list, problems = preflight_stack(lora_list, preflight_architecture(lora_preflight))
             
             # Generate output strings
-            selected_character_names = [char.get('name', 'Unnamed') for char in selected_characters]
+            selected_character_names = [char.name if char.name is not None else 'Unnamed' for char in selected_characters]
             selected_characters_str = ', '.join(selected_character_names)
             
             # Debug information
@@ -304,10 +291,13 @@ class MultiCharacterMixer:
             debug_info += f"Characters: {selected_characters_str}\n"
             debug_info += f"Base prompt: {base_prompt}\n"
             debug_info += f"Allow duplicates: {allow_duplicates}\n"
-            debug_info += f"Seed: {seed} (randomized: {randomize_seed})\n"
+            debug_info += coverage_info
+            debug_info += f"Seed: {seed} (randomized: {randomize_seed and not coverage_mode})\n"
             debug_info += f"Total LoRAs in stack: {len(lora_list)}"
+            if problems:
+                debug_info += f"\n{problems_text(problems)}"
             
-            return (base_prompt, all_character_prompts, lora_list, selected_characters_str, debug_info)
+            return (base_prompt, all_character_prompts, stack_output(lora_list), selected_characters_str, debug_info)
             
         except Exception as e:
             error_msg = f"Error: {str(e)}"
@@ -315,6 +305,10 @@ class MultiCharacterMixer:
     
     @classmethod
     def IS_CHANGED(cls, **kwargs):
+        # Coverage mode is deterministic in loop_count, so it never forces re-execution
+        if kwargs.get("coverage_mode", False):
+            return (kwargs.get("seed", 0), kwargs.get("loop_count", 0), kwargs.get("num_characters", 2),
+                    kwargs.get("allow_duplicates", False), kwargs.get("shuffle_combinations", True))
         # Force re-execution when randomize_seed is True or when other parameters change
         if kwargs.get("randomize_seed", False):
             return float("NaN")
@@ -1,14 +1,223 @@
-import random
-from nodes import LoraLoader
-import folder_paths
+import numpy as np
+from .rng import node_rng
+from .weighted_sampling import weighted_sample_items
+from .listings import lora_choices, timed_input_types, stats_text as listing_stats_text
+from .lora_pool import POOL_SPEC_INPUT, parse_pool_spec, pool_spec_fingerprint
+from .lora_metadata_index import LORA_METADATA_INDEX, MAX_STORED_TAGS
+from .lora_loader import LORA_WEIGHT_CACHE, PATCHED_MODEL_CACHE, DEFAULT_PATCHED_ENTRIES, apply_loras
+from .lora_rotation import draw_from_bag
+from .lora_stack import LoraStack, merge_policy_input, merged_stack, stack_output
+from .safetensors_header import lora_file_info, preflight_architecture, preflight_input, preflight_names, problems_text
+
+
+def strength_grid(min_str, max_str, strength_step=0.0, strength_levels=0):
+    """
+    Allowed strengths between min_str and max_str, or None for continuous strengths.
+    strength_levels takes precedence over strength_step when both are set
+    """
+    low, high = min(min_str, max_str), max(min_str, max_str)
+
+    if strength_levels > 0:
+        if strength_levels == 1 or low == high:
+            return [round((low + high) / 2, 4)]
+        span = (high - low) / (strength_levels - 1)
+        return [round(low + i * span, 4) for i in range(strength_levels)]
+
+    if strength_step > 0:
+        steps = int((high - low) / strength_step + 1e-9)
+        return [round(low + i * strength_step, 4) for i in range(steps + 1)]
+
+    return None
+
+
+def collect_lora_configs(kwargs, strength_step=0.0, strength_levels=0):
+    """
+    Extract the lora_{i}/min_str_{i}/max_str_{i}/trigger_words_{i}/weight_{i} widgets into lora configs.
+    The first slot of a LoRA sets its strengths, repeated slots add to its weight
+    """
+    lora_configs = []
+    configs_by_name = {}
+    for i in range(1, 51):  # Changed from 21 to 51 for 50 LoRAs
+        lora_name = kwargs.get(f"lora_{i}")
+        min_str = kwargs.get(f"min_str_{i}")
+        max_str = kwargs.get(f"max_str_{i}")
+        trigger_words = kwargs.get(f"trigger_words_{i}") or ""
+        weight = max(0.0, kwargs.get(f"weight_{i}", 1.0))
+
+        if lora_name is None or lora_name == "None":
+            continue
+        if lora_name in configs_by_name:
+            configs_by_name[lora_name]['weight'] += weight
+            continue
+
+        config = {"name": lora_name, "min_str": min_str, "max_str": max_str,
+                  "trigger_words": ', '.join([s.strip() for s in trigger_words.strip().split(',') if s.strip()]),
+                  "grid": strength_grid(min_str, max_str, strength_step, strength_levels),
+                  "weight": weight}
+        configs_by_name[lora_name] = config
+        lora_configs.append(config)
+
+    # A total weight of 0 disables the LoRA
+    return [config for config in lora_configs if config['weight'] > 0]
+
+
+def choose_loras(rng, lora_configs, count):
+    """Pick count lora configs without replacement, weighted when any weight differs from 1"""
+    if all(lora.get('weight', 1.0) == 1.0 for lora in lora_configs):
+        return rng.sample(lora_configs, count)
+    return weighted_sample_items(rng, lora_configs, [lora['weight'] for lora in lora_configs], count)
+
+
+def pool_lora_configs(pool_spec, strength_step=0.0, strength_levels=0):
+    """Lora configs from a compact pool spec, with the strength grid applied"""
+    return [dict(config, grid=strength_grid(config['min_str'], config['max_str'], strength_step, strength_levels))
+            for config in parse_pool_spec(pool_spec) if config['weight'] > 0]
+
+
+def preflight_configs(lora_configs, architecture):
+    """Drop configs whose LoRA file is missing, unreadable or made for another base model"""
+    if architecture is None or not lora_configs:
+        return lora_configs, []
+    usable, problems = preflight_names([lora['name'] for lora in lora_configs], architecture)
+    usable = set(usable)
+    return [lora for lora in lora_configs if lora['name'] in usable], problems
+
+
+def lora_bytes(lora_name):
+    """Memory a LoRA costs: its tensor data size, or the file size when the header can't be read"""
+    info = lora_file_info(lora_name)
+    return info.tensor_bytes or info.size_bytes
+
+
+def budget_filter(budget_bytes):
+    """Predicate that accepts a config if it still fits the byte budget with those accepted before it"""
+    total = 0
+
+    def fits(lora):
+        nonlocal total
+        size = lora_bytes(lora['name'])
+        if total + size > budget_bytes:
+            return False
+        total += size
+        return True
+
+    return fits
+
+
+def fit_budget(ordered_configs, count, budget_bytes):
+    """
+    Greedy pass over configs in the order given (a random sampling order), keeping each LoRA
+    that still fits the byte budget until count are chosen. One pass, no rejection sampling
+    """
+    fits = budget_filter(budget_bytes)
+    chosen = []
+    for lora in ordered_configs:
+        if fits(lora):
+            chosen.append(lora)
+            if len(chosen) == count:
+                break
+    return chosen
+
+
+def estimated_mb(loras):
+    """Size of the chosen LoRAs in MB, from their safetensors headers"""
+    return sum(lora_bytes(lora['name']) for lora in loras) / (1024 * 1024)
+
+
+def index_marker(kwargs):
+    """Metadata index generation when auto trigger words are on, so cached results refresh as the index fills in"""
+    if kwargs.get("auto_trigger_words", 0) > 0:
+        return LORA_METADATA_INDEX.generation()
+    return ""
+
+
+def lora_trigger_words(lora, auto_trigger_words):
+    """Trigger words of a config, or its top indexed metadata tags when the field is empty"""
+    if lora['trigger_words'] or auto_trigger_words <= 0:
+        return lora['trigger_words']
+    return LORA_METADATA_INDEX.trigger_words(lora['name'], auto_trigger_words)
+
+
+def sample_strength(rng, lora):
+    """Draw a strength for a lora config, snapping to its grid if it has one"""
+    if lora.get('grid') is not None:
+        return rng.choice(lora['grid'])
+    return rng.uniform(lora['min_str'], lora['max_str'])
+
+
+def count_configurations(lora_configs, min_random, max_random):
+    """
+    Number of distinct (lora set, strengths) combinations the pool can produce,
+    or None if any strength is continuous
+    """
+    # counts[k] = sum over all k-subsets of the product of their grid sizes
+    counts = [1] + [0] * len(lora_configs)
+    for lora in lora_configs:
+        if lora.get('grid') is None:
+            return None
+        levels = len(lora['grid'])
+        for k in range(len(lora_configs), 0, -1):
+            counts[k] += counts[k - 1] * levels
+    return sum(counts[min_random:max_random + 1])
+
+
+def selection_info(lora_configs, chosen_count, min_random, max_random, strength_step, strength_levels):
+    """Human readable summary of the pool and the strength mode"""
+    info = f"Pool: {len(lora_configs)} LoRAs\n"
+    info += f"Chosen: {chosen_count}\n"
+    if strength_levels > 0:
+        info += f"Strength mode: grid ({strength_levels} levels)\n"
+    elif strength_step > 0:
+        info += f"Strength mode: grid (step {strength_step})\n"
+    else:
+        info += "Strength mode: continuous\n"
+
+    configurations = count_configurations(lora_configs, min_random, max_random) if lora_configs else 0
+    if configurations is None:
+        info += "Distinct configurations: unbounded"
+    else:
+        info += f"Distinct configurations: {configurations}"
+    return info
+
+
+# Per-slot selection weights, kept in "optional" after the other widgets so saved workflows keep their widget order
+SLOT_WEIGHT_INPUTS = {
+    f"weight_{i}": ("FLOAT", {"default": 1.0, "min": 0.0, "max": 100.0, "step": 0.1,
+                              "tooltip": f"Selection weight of LoRA {i}. Repeating a LoRA adds up its weights, 0 disables it"})
+    for i in range(1, 51)
+}
+
+STRENGTH_GRID_INPUTS = {
+    "strength_step": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 10.0, "step": 0.01,
+                                "tooltip": "Snap random strengths to multiples of this step from min_str. 0 keeps strengths continuous"}),
+    "strength_levels": ("INT", {"default": 0, "min": 0, "max": 100,
+                                "tooltip": "Pick strengths from this many evenly spaced levels per LoRA. Overrides strength_step. 0 disables"}),
+}
+
+
+ROTATION_INPUT = ("BOOLEAN", {"default": False,
+                              "tooltip": "Draw LoRAs from a persistent shuffle bag per pool, so every LoRA is used once before any repeats. Ignores seed order and weights"})
+
+
+MAX_LORA_MB_INPUT = ("FLOAT", {"default": 0.0, "min": 0.0, "max": 1048576.0, "step": 16.0,
+                               "tooltip": "Total size budget in MB for the chosen LoRAs, read from their safetensors headers. "
+                                          "LoRAs are taken in random order while they fit, so fewer than rolled may be picked. "
+                                          "Changes which LoRAs a seed picks. 0 disables"})
+
+
+AUTO_TRIGGER_INPUT = ("INT", {"default": 0, "min": 0, "max": MAX_STORED_TAGS,
+                              "tooltip": "When a LoRA's trigger words are empty, use its trigger phrase and most frequent "
+                                         "training tags from the safetensors metadata index, this many in total. 0 disables"})
+
 
 class RandomizeLoras:
     def __init__(self):
         pass
 
     @classmethod
+    @timed_input_types
     def INPUT_TYPES(cls):
-        loras = ["None"] + folder_paths.get_filename_list("loras")
+        loras = lora_choices()
         inputs = {
             "required": {
                 "model": ("MODEL",),
@@ -24,30 +233,47 @@ class RandomizeLoras:
             inputs["required"][f"max_str_{i}"] = ("FLOAT", {"default": 1.0, "min": -10.0, "max": 10.0, "step": 0.01})
             inputs["required"][f"trigger_words_{i}"] = ("STRING", { "multiline": False, "default": "" })
 
+        inputs["optional"] = {
+            "fused_apply": ("BOOLEAN", {"default": True,
+                                        "tooltip": "If True, applies all chosen LoRAs in one pass with a single model/clip clone"}),
+            "patched_cache_size": ("INT", {"default": DEFAULT_PATCHED_ENTRIES, "min": 0, "max": 64,
+                                           "tooltip": "Number of patched model/clip combinations to keep for reuse. The shared cache "
+                                                      "keeps the largest size any node asks for. 0 disables the cache for this node"}),
+            **STRENGTH_GRID_INPUTS,
+            **SLOT_WEIGHT_INPUTS,
+            "rotation_mode": ROTATION_INPUT,
+            "lora_preflight": preflight_input("off", auto=True),
+            "max_lora_mb": MAX_LORA_MB_INPUT,
+            "auto_trigger_words": AUTO_TRIGGER_INPUT,
+        }
+        inputs["hidden"] = {"unique_id": "UNIQUE_ID"}
+
         return inputs
   
-    RETURN_TYPES = ("MODEL", "CLIP", "STRING", "STRING")
-    RETURN_NAMES = ("model", "clip", "trigger_words", "chosen_loras")
+    RETURN_TYPES = ("MODEL", "CLIP", "STRING", "STRING", "STRING", "FLOAT")
+    RETURN_NAMES = ("model", "clip", "trigger_words", "chosen_loras", "selection_info", "estimated_mb")
     FUNCTION = "load_lora"
     CATEGORY = "SimpleRandomLora/lora"
 
-    def load_lora(self, model, clip, seed, min_random, max_random, **kwargs):      
-        if seed is not None:
-            random.seed(seed)  # For reproducibility
+    def load_lora(self, model, clip, seed, min_random, max_random, fused_apply=True, patched_cache_size=DEFAULT_PATCHED_ENTRIES,
+                  strength_step=0.0, strength_levels=0, rotation_mode=False, lora_preflight="off", max_lora_mb=0.0,
+                  auto_trigger_words=0, unique_id=None, **kwargs):      
+        # Dynamically extract lora configurations from kwargs
+        lora_configs = collect_lora_configs(kwargs, strength_step, strength_levels)
 
-        # Initialize list to hold lora configurations
-        lora_configs = []
+        return self.randomize_loras(model, clip, seed, min_random, max_random, lora_configs,
+                                    fused_apply, patched_cache_size, strength_step, strength_levels, rotation_mode,
+                                    lora_preflight, max_lora_mb, auto_trigger_words, unique_id)
 
-        # Dynamically extract lora configurations from kwargs
-        for i in range(1, 51):  # Changed from 21 to 51 for 50 LoRAs
-            lora_name = kwargs.get(f"lora_{i}")
-            min_str = kwargs.get(f"min_str_{i}")
-            max_str = kwargs.get(f"max_str_{i}")
-            trigger_words = kwargs.get(f"trigger_words_{i}")
+    def randomize_loras(self, model, clip, seed, min_random, max_random, lora_configs,
+                        fused_apply=True, patched_cache_size=DEFAULT_PATCHED_ENTRIES, strength_step=0.0, strength_levels=0,
+                        rotation_mode=False, lora_preflight="off", max_lora_mb=0.0, auto_trigger_words=0,
+                        unique_id=None):
+        # Private random stream for this node, reproducible for a given seed
+        rng = node_rng("RandomizeLoras", seed, node_id=unique_id)
 
-            if lora_name != "None" and not any(config['name'] == lora_name for config in lora_configs):
-                lora_configs.append({"name": lora_name, "min_str": min_str, "max_str": max_str, 
-                                     "trigger_words": ', '.join([s.strip() for s in trigger_words.strip().split(',') if s.strip()])})
+        # Skip LoRAs that would fail or mismatch the model, before anything is selected
+        lora_configs, problems = preflight_configs(lora_configs, preflight_architecture(lora_preflight, model))
 
         # Initialize the string to hold chosen loras and values
         chosen_str = ""
@@ -57,7 +283,10 @@ class RandomizeLoras:
 
         # Check if no loras are selected
         if len(lora_configs) == 0:
-            return (model, clip, chosen_trigger_words, chosen_str)
+            info = selection_info(lora_configs, 0, min_random, max_random, strength_step, strength_levels)
+            if problems:
+                info += f"\n{problems_text(problems)}"
+            return (model, clip, chosen_trigger_words, chosen_str, info, 0.0)
         
         # Cap min_random and max_random to length of lora configs
         min_random = min(min_random, len(lora_configs))
@@ -66,22 +295,39 @@ class RandomizeLoras:
         # Make sure max_random >= min_random
         max_random = max(min_random, max_random)        
 
-        # Randomly choose some of these loras
-        chosen_loras = random.sample(lora_configs, random.randint(min_random, max_random))
+        # Refresh the metadata index in the background, lookups below only read the index
+        index_status = LORA_METADATA_INDEX.prepare() if auto_trigger_words > 0 else ""
+
+        # Randomly choose some of these loras, or take the next ones from the pool's shuffle bag
+        count = rng.randint(min_random, max_random)
+        rotation_info = ""
+        budget_bytes = int(max_lora_mb * 1024 * 1024)
+        if rotation_mode:
+            # LoRAs that don't fit the budget stay in the bag instead of being used up
+            chosen_loras, rotation_info = draw_from_bag(lora_configs, [lora['name'] for lora in lora_configs], count,
+                                                        fits=budget_filter(budget_bytes) if budget_bytes > 0 else None)
+        elif budget_bytes > 0:
+            # Sampling order over the whole pool, then keep the first LoRAs that fit the budget
+            chosen_loras = fit_budget(choose_loras(rng, lora_configs, len(lora_configs)), count, budget_bytes)
+        else:
+            chosen_loras = choose_loras(rng, lora_configs, count)
+
+        # (name, model_strength, clip_strength) for every chosen lora
+        applied_loras = []
 
         for lora in chosen_loras:
             # Randomly determine a value between min_str and max_str
-            strength = random.uniform(lora['min_str'], lora['max_str'])
+            strength = sample_strength(rng, lora)
 
-            # Apply changes to model and clip
-            model, clip = LoraLoader().load_lora(model, clip, lora['name'], strength, strength)
+            # Queue changes to model and clip
+            applied_loras.append((lora['name'], strength, strength))
 
             # Append the current lora and its value to the string
             chosen_str += f"<lora:{lora['name'].split('.')[0]}:{strength:.2f}>, "
 
             # Append the trigger words for each lora
             existing_chosen_trigger_words = set(chosen_trigger_words.split(', '))
-            chosen_trigger_words = set(lora['trigger_words'].split(', '))
+            chosen_trigger_words = set(lora_trigger_words(lora, auto_trigger_words).split(', '))
             combined_words = existing_chosen_trigger_words | chosen_trigger_words
             chosen_trigger_words = ', '.join(sorted(combined_words))
 
@@ -90,16 +336,40 @@ class RandomizeLoras:
         # Slice the string to remove the last comma and everything after it
         if last_comma_index != -1:
             chosen_str = chosen_str[:last_comma_index]
+
+        # Apply all chosen loras at once
+        if applied_loras:
+            model, clip = apply_loras(model, clip, applied_loras, fused=fused_apply, cache_entries=patched_cache_size)
             
-        return (model, clip, chosen_trigger_words.lstrip(", "), chosen_str)
+        info = selection_info(lora_configs, len(chosen_loras), min_random, max_random, strength_step, strength_levels)
+        if rotation_info:
+            info += f"\n{rotation_info}"
+        chosen_mb = estimated_mb(chosen_loras)
+        if index_status:
+            info += f"\n{index_status}"
+        if budget_bytes > 0:
+            info += f"\nMemory: {chosen_mb:.1f} of {max_lora_mb:g} MB budget"
+            if len(chosen_loras) < count:
+                info += f", only {len(chosen_loras)} of {count} LoRAs fit"
+        if problems:
+            info += f"\n{problems_text(problems)}"
+        return (model, clip, chosen_trigger_words.lstrip(", "), chosen_str, info, chosen_mb)
+
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        # Rotation advances on every run, so never reuse a cached result
+        if kwargs.get("rotation_mode", False):
+            return float("NaN")
+        return index_marker(kwargs)
     
 class RandomizeLorasStack:
     def __init__(self):
         pass
 
     @classmethod
+    @timed_input_types
     def INPUT_TYPES(cls):
-        loras = ["None"] + folder_paths.get_filename_list("loras")
+        loras = lora_choices()
         inputs = {
             "required": {
                 "seed": ("INT", {"default": 0, "min": 0, "max": 0xffffffffffffffff}),
@@ -114,38 +384,42 @@ class RandomizeLorasStack:
             inputs["required"][f"trigger_words_{i}"] = ("STRING", { "multiline": False, "default": "" })
 
         inputs["optional"] = {
-            "lora_stack": ("LORA_STACK",)
+            "lora_stack": ("LORA_STACK",),
+            **STRENGTH_GRID_INPUTS,
+            **SLOT_WEIGHT_INPUTS,
+            "lora_merge": merge_policy_input("keep"),
+            "lora_preflight": preflight_input("off"),
+            "auto_trigger_words": AUTO_TRIGGER_INPUT,
         }
+        inputs["hidden"] = {"unique_id": "UNIQUE_ID"}
 
         return inputs
   
-    RETURN_TYPES = ("LORA_STACK", "STRING", "STRING")
-    RETURN_NAMES = ("LORA_STACK", "trigger_words", "chosen_loras")
+    RETURN_TYPES = ("LORA_STACK", "STRING", "STRING", "STRING")
+    RETURN_NAMES = ("LORA_STACK", "trigger_words", "chosen_loras", "selection_info")
     FUNCTION = "load_lora_stack"
     CATEGORY = "unwdef/lora"
 
-    def load_lora_stack(self, seed, min_random, max_random, lora_stack=None, **kwargs):      
-        if seed is not None:
-            random.seed(seed)  # For reproducibility
+    def load_lora_stack(self, seed, min_random, max_random, lora_stack=None, strength_step=0.0, strength_levels=0,
+                        lora_merge="keep", lora_preflight="off", auto_trigger_words=0, unique_id=None, **kwargs):      
+        # Dynamically extract lora configurations from kwargs
+        lora_configs = collect_lora_configs(kwargs, strength_step, strength_levels)
 
-        # Initialize list to hold lora configurations
-        lora_configs = []
+        return self.randomize_lora_stack(seed, min_random, max_random, lora_configs, lora_stack,
+                                         strength_step, strength_levels, lora_merge, lora_preflight, auto_trigger_words,
+                                         unique_id)
 
-        # Initialize lora stack list
-        lora_list = list()
-        if lora_stack is not None:
-            lora_list.extend([l for l in lora_stack if l[0] != "None"])
+    def randomize_lora_stack(self, seed, min_random, max_random, lora_configs, lora_stack=None,
+                             strength_step=0.0, strength_levels=0, lora_merge="keep", lora_preflight="off",
+                             auto_trigger_words=0, unique_id=None):
+        # Private random stream for this node, reproducible for a given seed
+        rng = node_rng("RandomizeLorasStack", seed, node_id=unique_id)
 
-        # Dynamically extract lora configurations from kwargs
-        for i in range(1, 51):  # Changed from 21 to 51 for 50 LoRAs
-            lora_name = kwargs.get(f"lora_{i}")
-            min_str = kwargs.get(f"min_str_{i}")
-            max_str = kwargs.get(f"max_str_{i}")
-            trigger_words = kwargs.get(f"trigger_words_{i}")
+        # Skip LoRAs that would fail or mismatch the base model, before anything is selected
+        lora_configs, problems = preflight_configs(lora_configs, preflight_architecture(lora_preflight))
 
-            if lora_name != "None" and not any(config['name'] == lora_name for config in lora_configs):
-                lora_configs.append({"name": lora_name, "min_str": min_str, "max_str": max_str, 
-                                     "trigger_words": ', '.join([s.strip() for s in trigger_words.strip().split(',') if s.strip()])})
+        # Chosen (name, model_strength, clip_strength) entries, merged into the incoming stack at the end
+        chosen_entries = []
 
         # Initialize the string to hold chosen loras and values
         chosen_str = ""
@@ -155,7 +429,10 @@ class RandomizeLorasStack:
 
         # Check if no loras are selected
         if len(lora_configs) == 0:
-            return (lora_list, chosen_trigger_words, chosen_str, )
+            info = selection_info(lora_configs, 0, min_random, max_random, strength_step, strength_levels)
+            if problems:
+                info += f"\n{problems_text(problems)}"
+            return (merged_stack(lora_stack, chosen_entries, lora_merge), chosen_trigger_words, chosen_str, info, )
         
         # Cap min_random and max_random to length of lora configs
         min_random = min(min_random, len(lora_configs))
@@ -164,22 +441,25 @@ class RandomizeLorasStack:
         # Make sure max_random >= min_random
         max_random = max(min_random, max_random)  
 
+        # Refresh the metadata index in the background, lookups below only read the index
+        index_status = LORA_METADATA_INDEX.prepare() if auto_trigger_words > 0 else ""
+
         # Randomly choose some of these loras
-        chosen_loras = random.sample(lora_configs, random.randint(min_random, max_random))
+        chosen_loras = choose_loras(rng, lora_configs, rng.randint(min_random, max_random))
 
         for lora in chosen_loras:
             # Randomly determine a value between min_str and max_str
-            strength = random.uniform(lora['min_str'], lora['max_str'])
+            strength = sample_strength(rng, lora)
 
             # Add to the stack
-            lora_list.extend([(lora['name'], strength, strength)]),
+            chosen_entries.append((lora['name'], strength, strength))
 
             # Append the current lora and its value to the string
             chosen_str += f"<lora:{lora['name'].split('.')[0]}:{strength:.2f}>, "
 
             # Append the trigger words for each lora
             existing_chosen_trigger_words = set(chosen_trigger_words.split(', '))
-            chosen_trigger_words = set(lora['trigger_words'].split(', '))
+            chosen_trigger_words = set(lora_trigger_words(lora, auto_trigger_words).split(', '))
             combined_words = existing_chosen_trigger_words | chosen_trigger_words
             chosen_trigger_words = ', '.join(sorted(combined_words))
 
@@ -189,13 +469,125 @@ class RandomizeLorasStack:
         if last_comma_index != -1:
             chosen_str = chosen_str[:last_comma_index]
             
-        return (lora_list, chosen_trigger_words.lstrip(", "), chosen_str,)
+        # Duplicates of incoming LoRAs are combined by lora_merge instead of loaded twice
+        lora_list = merged_stack(lora_stack, chosen_entries, lora_merge)
+
+        info = selection_info(lora_configs, len(chosen_loras), min_random, max_random, strength_step, strength_levels)
+        if index_status:
+            info += f"\n{index_status}"
+        if problems:
+            info += f"\n{problems_text(problems)}"
+        return (lora_list, chosen_trigger_words.lstrip(", "), chosen_str, info,)
+
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        # Trigger words filled from the metadata index change as it fills in
+        return index_marker(kwargs)
+
+
+class RandomizeLorasPool(RandomizeLoras):
+    """
+    RandomizeLoras driven by a compact pool spec instead of 50 fixed LoRA widgets.
+    The spec is multiline text, JSON, or a path to a pool file - see lora_pool.py for the format
+    """
+
+    @classmethod
+    @timed_input_types
+    def INPUT_TYPES(cls):
+        inputs = {
+            "required": {
+                "model": ("MODEL",),
+                "clip": ("CLIP", ),
+                "seed": ("INT", {"default": 0, "min": 0, "max": 0xffffffffffffffff}),
+                "min_random": ("INT", {"default": 1, "min": 1, "max": 10000}),
+                "max_random": ("INT", {"default": 50, "min": 1, "max": 10000}),
+                "pool_spec": POOL_SPEC_INPUT,
+            },
+            "optional": {
+                "fused_apply": ("BOOLEAN", {"default": True,
+                                            "tooltip": "If True, applies all chosen LoRAs in one pass with a single model/clip clone"}),
+                "patched_cache_size": ("INT", {"default": DEFAULT_PATCHED_ENTRIES, "min": 0, "max": 64,
+                                               "tooltip": "Number of patched model/clip combinations to keep for reuse. The shared cache "
+                                                      "keeps the largest size any node asks for. 0 disables the cache for this node"}),
+                **STRENGTH_GRID_INPUTS,
+                "rotation_mode": ROTATION_INPUT,
+                "lora_preflight": preflight_input("off", auto=True),
+                "max_lora_mb": MAX_LORA_MB_INPUT,
+                "auto_trigger_words": AUTO_TRIGGER_INPUT,
+            },
+            "hidden": {"unique_id": "UNIQUE_ID"},
+        }
+        return inputs
+
+    FUNCTION = "load_lora_pool"
+
+    def load_lora_pool(self, model, clip, seed, min_random, max_random, pool_spec, fused_apply=True,
+                       patched_cache_size=DEFAULT_PATCHED_ENTRIES, strength_step=0.0, strength_levels=0,
+                       rotation_mode=False, lora_preflight="off", max_lora_mb=0.0, auto_trigger_words=0,
+                       unique_id=None):
+        lora_configs = pool_lora_configs(pool_spec, strength_step, strength_levels)
+        return self.randomize_loras(model, clip, seed, min_random, max_random, lora_configs,
+                                    fused_apply, patched_cache_size, strength_step, strength_levels, rotation_mode,
+                                    lora_preflight, max_lora_mb, auto_trigger_words, unique_id)
+
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        if kwargs.get("rotation_mode", False):
+            return float("NaN")
+        # Re-execute when a referenced pool file changes on disk
+        return (kwargs.get("seed", 0), pool_spec_fingerprint(kwargs.get("pool_spec", "")), index_marker(kwargs))
+
+
+class RandomizeLorasStackPool(RandomizeLorasStack):
+    """
+    RandomizeLorasStack driven by a compact pool spec instead of 50 fixed LoRA widgets
+    """
+
+    @classmethod
+    @timed_input_types
+    def INPUT_TYPES(cls):
+        inputs = {
+            "required": {
+                "seed": ("INT", {"default": 0, "min": 0, "max": 0xffffffffffffffff}),
+                "min_random": ("INT", {"default": 1, "min": 1, "max": 10000}),
+                "max_random": ("INT", {"default": 50, "min": 1, "max": 10000}),
+                "pool_spec": POOL_SPEC_INPUT,
+            },
+            "optional": {
+                "lora_stack": ("LORA_STACK",),
+                **STRENGTH_GRID_INPUTS,
+                "lora_merge": merge_policy_input("keep"),
+                "lora_preflight": preflight_input("off"),
+                "auto_trigger_words": AUTO_TRIGGER_INPUT,
+            },
+            "hidden": {"unique_id": "UNIQUE_ID"},
+        }
+        return inputs
+
+    FUNCTION = "load_lora_stack_pool"
+    CATEGORY = "SimpleRandomLora/lora"
+
+    def load_lora_stack_pool(self, seed, min_random, max_random, pool_spec, lora_stack=None,
+                             strength_step=0.0, strength_levels=0, lora_merge="keep", lora_preflight="off",
+                             auto_trigger_words=0, unique_id=None):
+        lora_configs = pool_lora_configs(pool_spec, strength_step, strength_levels)
+        return self.randomize_lora_stack(seed, min_random, max_random, lora_configs, lora_stack,
+                                         strength_step, strength_levels, lora_merge, lora_preflight, auto_trigger_words,
+                                         unique_id)
+
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        # Re-execute when a referenced pool file changes on disk
+        return (kwargs.get("seed", 0), pool_spec_fingerprint(kwargs.get("pool_spec", "")), index_marker(kwargs))
+
 
 # Keep your existing advanced class if you want to retain it
 class RandomLoraChooserAdvanced:
     @classmethod
+    @timed_input_types
     def INPUT_TYPES(cls):
         max_lora_num = 50  # Changed from 20 to 50
+        loras = lora_choices()
         
         inputs = {
             "required": {
@@ -212,7 +604,7 @@ class RandomLoraChooserAdvanced:
         # Add dynamic LoRA inputs
         for i in range(1, max_lora_num + 1):  # Now goes to 51 (50 LoRAs)
             inputs["optional"][f"lora_{i}_name"] = (
-                ["None"] + folder_paths.get_filename_list("loras"), 
+                loras, 
                 {"default": "None"}
             )
             inputs["optional"][f"lora_{i}_trigger"] = (
@@ -227,6 +619,10 @@ class RandomLoraChooserAdvanced:
                 "FLOAT", 
                 {"default": 1.0, "min": 0.0, "max": 2.0, "step": 0.01}
             )
+        inputs["optional"]["lora_merge"] = merge_policy_input("keep")
+        inputs["optional"]["lora_preflight"] = preflight_input("off")
+        inputs["optional"]["auto_trigger_words"] = AUTO_TRIGGER_INPUT
+        inputs["hidden"] = {"unique_id": "UNIQUE_ID"}
             
         return inputs
     
@@ -236,34 +632,27 @@ class RandomLoraChooserAdvanced:
     FUNCTION = "choose_random_lora_advanced"
     CATEGORY = "Random LoRA Chooser"
     
-    def choose_random_lora_advanced(self, num_loras, seed, randomize_seed, return_full_stack, input_lora_stack=None, **kwargs):
-        # Set random seed
-        if randomize_seed:
-            random.seed()
-        else:
-            random.seed(seed)
+    def choose_random_lora_advanced(self, num_loras, seed, randomize_seed, return_full_stack, input_lora_stack=None,
+                                    lora_merge="keep", lora_preflight="off", auto_trigger_words=0, unique_id=None,
+                                    **kwargs):
+        # Private random stream for this node, fresh entropy when randomize_seed is set
+        rng = node_rng("RandomLoraChooserAdvanced", seed, randomize_seed, unique_id)
+        
+        # Filter and index the input stack once ("None" entries from ComfyRoll stacks are dropped)
+        upstream = LoraStack.from_upstream(input_lora_stack, lora_merge)
         
         # Collect available LoRAs from the inputs
         available_loras = []
         
         # Add LoRAs from input stack if provided
-        if input_lora_stack:
-            for lora_data in input_lora_stack:
-                # Handle both ComfyRoll and standard LoRA stack formats
-                if len(lora_data) >= 3:
-                    lora_name = lora_data[0]
-                    model_weight = lora_data[1]
-                    clip_weight = lora_data[2] if len(lora_data) > 2 else model_weight
-                    
-                    # Skip "None" entries from ComfyRoll stacks
-                    if lora_name and lora_name != "None":
-                        available_loras.append({
-                            "name": lora_name,
-                            "trigger": "",  # LoRA stacks don't typically include trigger words
-                            "model_weight": model_weight,
-                            "clip_weight": clip_weight,
-                            "source": "stack"
-                        })
+        for lora_name, model_weight, clip_weight in upstream:
+            available_loras.append({
+                "name": lora_name,
+                "trigger": "",  # LoRA stacks don't typically include trigger words
+                "model_weight": model_weight,
+                "clip_weight": clip_weight,
+                "source": "stack"
+            })
         
         # Add LoRAs from widget inputs
         for i in range(1, num_loras + 1):
@@ -282,6 +671,16 @@ class RandomLoraChooserAdvanced:
                     "index": i
                 })
         
+        # Skip LoRAs that would fail or mismatch the base model, before choosing
+        architecture = preflight_architecture(lora_preflight)
+        problems = []
+        if architecture is not None:
+            usable, problems = preflight_names(sorted({lora["name"] for lora in available_loras}), architecture)
+            usable = set(usable)
+            available_loras = [lora for lora in available_loras if lora["name"] in usable]
+            if problems:
+                upstream = LoraStack([lora for lora in upstream if lora[0] in usable], lora_merge)
+        
         # Debug info
         debug_info = f"Total configured LoRAs: {num_loras}\n"
         debug_info += f"Available LoRAs: {len(available_loras)}\n"
@@ -289,14 +688,22 @@ class RandomLoraChooserAdvanced:
         debug_info += f"From widgets: {sum(1 for l in available_loras if l['source'] == 'widget')}\n"
         debug_info += f"Return full stack: {return_full_stack}\n"
         debug_info += f"Seed: {seed}\n"
-        debug_info += f"Randomize: {randomize_seed}\n\n"
+        debug_info += f"Randomize: {randomize_seed}\n"
+        if problems:
+            debug_info += f"{problems_text(problems)}\n"
+        debug_info += "\n"
         
         if not available_loras:
             empty_stack = []
             return ("None", "", 0.0, 0.0, empty_stack, debug_info + "No LoRAs available!")
         
         # Choose random LoRA
-        chosen_lora = random.choice(available_loras)
+        chosen_lora = rng.choice(available_loras)
+
+        # Stack entries and empty trigger fields fall back to the LoRA's indexed metadata tags
+        if not chosen_lora["trigger"] and auto_trigger_words > 0:
+            debug_info += f"{LORA_METADATA_INDEX.prepare()}\n"
+            chosen_lora["trigger"] = LORA_METADATA_INDEX.trigger_words(chosen_lora["name"], auto_trigger_words)
         
         debug_info += f"Chosen LoRA: {chosen_lora['name']}\n"
         debug_info += f"Trigger Word: {chosen_lora['trigger']}\n"
@@ -305,25 +712,21 @@ class RandomLoraChooserAdvanced:
         debug_info += f"Source: {chosen_lora['source']}"
         
         # Create output LoRA stack
+        chosen_entry = (chosen_lora["name"], chosen_lora["model_weight"], chosen_lora["clip_weight"])
         if return_full_stack and input_lora_stack:
-            # Return the original input stack plus the chosen LoRA
-            output_stack = []
-            # Add original stack (filtering out "None" entries)
-            for lora_data in input_lora_stack:
-                if len(lora_data) >= 3 and lora_data[0] != "None":
-                    output_stack.append(lora_data)
-            # Add chosen LoRA
-            output_stack.append((chosen_lora["name"], chosen_lora["model_weight"], chosen_lora["clip_weight"]))
+            # Return the input stack plus the chosen LoRA, merged by lora_merge if it was already there
+            output_stack = upstream
+            output_stack.append(chosen_entry)
         else:
             # Return only the chosen LoRA
-            output_stack = [(chosen_lora["name"], chosen_lora["model_weight"], chosen_lora["clip_weight"])]
+            output_stack = LoraStack([chosen_entry], lora_merge)
         
         return (
             chosen_lora["name"],
             chosen_lora["trigger"],
             chosen_lora["model_weight"],
             chosen_lora["clip_weight"],
-            output_stack,
+            stack_output(output_stack),
             debug_info
         )
     
@@ -332,4 +735,150 @@ class RandomLoraChooserAdvanced:
         # Force re-execution when randomize_seed is True
         if kwargs.get("randomize_seed", False):
             return float("NaN")
-        return kwargs.get("seed", 0)
\ No newline at end of file
+        return (kwargs.get("seed", 0), index_marker(kwargs))
+
+
+class RandomizeLorasStackBatch:
+    """
+    Batch version of RandomizeLorasStack - samples batch_size stacks in one execution
+    with vectorized NumPy draws and returns them as lists
+    """
+
+    @classmethod
+    @timed_input_types
+    def INPUT_TYPES(cls):
+        inputs = RandomizeLorasStack.INPUT_TYPES()
+        inputs["required"]["batch_size"] = ("INT", {"default": 16, "min": 1, "max": 100000,
+                                                    "tooltip": "Number of LoRA stacks to sample"})
+        return inputs
+
+    RETURN_TYPES = ("LORA_STACK", "STRING", "STRING", "STRING")
+    RETURN_NAMES = ("LORA_STACK", "trigger_words", "chosen_loras", "selection_info")
+    OUTPUT_IS_LIST = (True, True, True, False)
+    FUNCTION = "load_lora_stacks"
+    CATEGORY = "SimpleRandomLora/lora"
+
+    def load_lora_stacks(self, seed, min_random, max_random, batch_size, lora_stack=None,
+                         strength_step=0.0, strength_levels=0, lora_merge="keep", lora_preflight="off",
+                         auto_trigger_words=0, **kwargs):
+        # Incoming stack is prepended to every sampled stack, indexed once and copied per stack
+        base_list = LoraStack.from_upstream(lora_stack, lora_merge)
+        # keep never merges, so rows can be built as plain lists without the name index
+        plain_base = stack_output(base_list) if lora_merge == "keep" else None
+
+        lora_configs = collect_lora_configs(kwargs, strength_step, strength_levels)
+        lora_configs, problems = preflight_configs(lora_configs, preflight_architecture(lora_preflight))
+        num_configs = len(lora_configs)
+
+        info = f"Batch: {batch_size} stacks from a pool of {num_configs} LoRAs"
+        if problems:
+            info += f"\n{problems_text(problems)}"
+
+        if num_configs == 0:
+            return ([stack_output(base_list) for _ in range(batch_size)],
+                    [""] * batch_size, [""] * batch_size, info)
+
+        # Cap min_random and max_random to length of lora configs
+        min_random = min(min_random, num_configs)
+        max_random = max(min_random, min(max_random, num_configs))
+
+        rng = np.random.default_rng(seed)
+
+        # How many loras each stack gets, and a random permutation of the pool per stack
+        counts = rng.integers(min_random, max_random + 1, size=batch_size)
+        order_keys = rng.random((batch_size, num_configs))
+        weights = np.array([lora['weight'] for lora in lora_configs])
+        if np.all(weights == 1.0):
+            orders = np.argsort(order_keys, axis=1)
+        else:
+            # Exponential keys -log(1 - u) / w in ascending order give weighted permutations
+            orders = np.argsort(-np.log1p(-order_keys) / weights, axis=1)
+
+        # One uniform draw per (stack, lora), mapped onto each lora's range or grid
+        draws = rng.random((batch_size, num_configs))
+        strengths = np.empty_like(draws)
+        for j, lora in enumerate(lora_configs):
+            if lora['grid'] is not None:
+                grid = np.asarray(lora['grid'])
+                strengths[:, j] = grid[np.minimum((draws[:, j] * len(grid)).astype(np.int64), len(grid) - 1)]
+            else:
+                strengths[:, j] = lora['min_str'] + (lora['max_str'] - lora['min_str']) * draws[:, j]
+
+        # Refresh the metadata index in the background, lookups below only read the index
+        if auto_trigger_words > 0:
+            info += f"\n{LORA_METADATA_INDEX.prepare()}"
+
+        # Precompute per-lora strings once
+        short_names = [lora['name'].split('.')[0] for lora in lora_configs]
+        trigger_sets = [set(filter(None, lora_trigger_words(lora, auto_trigger_words).split(', ')))
+                        for lora in lora_configs]
+
+        stacks = []
+        trigger_words = []
+        chosen_strs = []
+        for row in range(batch_size):
+            chosen = orders[row, :counts[row]].tolist()
+            row_strengths = strengths[row]
+
+            entries = []
+            chosen_parts = []
+            words = set()
+            for j in chosen:
+                strength = float(row_strengths[j])
+                entries.append((lora_configs[j]['name'], strength, strength))
+                chosen_parts.append(f"<lora:{short_names[j]}:{strength:.2f}>")
+                words |= trigger_sets[j]
+
+            if plain_base is not None:
+                stacks.append(plain_base + entries)
+            else:
+                lora_list = LoraStack.from_upstream(base_list, lora_merge)
+                lora_list.extend(entries)
+                stacks.append(stack_output(lora_list))
+            trigger_words.append(', '.join(sorted(words)))
+            chosen_strs.append(', '.join(chosen_parts))
+
+        return (stacks, trigger_words, chosen_strs, info)
+
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        # Trigger words filled from the metadata index change as it fills in
+        return index_marker(kwargs)
+
+
+class LoraCacheStats:
+    """
+    Reports hit/miss/eviction counters of the shared LoRA weight cache and lets you resize it
+    """
+
+    @classmethod
+    @timed_input_types
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "budget_mb": ("INT", {"default": 0, "min": 0, "max": 262144, "step": 64,
+                                      "tooltip": "New cache budget in MB. 0 keeps the current budget"}),
+                "clear_cache": ("BOOLEAN", {"default": False,
+                                            "tooltip": "If True, drops all cached LoRA weights and patched models and resets the patched model cache size"}),
+            }
+        }
+
+    RETURN_TYPES = ("STRING",)
+    RETURN_NAMES = ("cache_info",)
+
+    FUNCTION = "get_stats"
+    CATEGORY = "SimpleRandomLora/lora"
+
+    def get_stats(self, budget_mb, clear_cache):
+        if budget_mb > 0:
+            LORA_WEIGHT_CACHE.set_budget(budget_mb * 1024 * 1024)
+        if clear_cache:
+            LORA_WEIGHT_CACHE.clear()
+            PATCHED_MODEL_CACHE.clear()
+            PATCHED_MODEL_CACHE.set_max_entries(DEFAULT_PATCHED_ENTRIES)
+        return (LORA_WEIGHT_CACHE.stats_text() + "\n\n" + PATCHED_MODEL_CACHE.stats_text() + "\n\n" + listing_stats_text(),)
+
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        # Counters change with every run, always re-execute
+        return float("NaN")
\ No newline at end of file
@@ -0,0 +1,210 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import folder_paths
+
+from .video_index import is_video_file, resolve_folder
+
+
+# How long a cold start may block an execution before it returns a partial listing
+COLD_START_WAIT = 5.0
+# Minimum time between incremental refreshes of the same tree
+REFRESH_INTERVAL = 10.0
+# Commit the cold-start walk every this many directories so progress becomes visible
+COMMIT_EVERY_DIRS = 500
+
+
+def default_db_path() -> str:
+    return os.path.join(folder_paths.get_user_directory(), "simple_random_lora", "video_index.sqlite")
+
+
+class RecursiveVideoIndex:
+    """
+    Persistent SQLite index of video files under a folder tree.
+    The first build walks the tree in a background thread; later refreshes only stat each
+    known directory and rescan the ones whose mtime changed, so they never re-walk the tree
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._threads = {}  # root -> refresh thread
+        self._last_refresh = {}  # root -> time.monotonic() of the last finished refresh
+        self._listings = {}  # root -> tuple of full paths
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.db_path is None:
+            self.db_path = default_db_path()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS roots (root TEXT PRIMARY KEY, complete INTEGER NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS dirs (root TEXT, path TEXT, mtime_ns INTEGER, PRIMARY KEY (root, path))")
+            conn.execute("CREATE TABLE IF NOT EXISTS files (root TEXT, dir TEXT, name TEXT, PRIMARY KEY (root, dir, name))")
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def list_videos(self, folder_path: str) -> Tuple[Tuple[str, ...], str]:
+        """
+        All videos under folder_path, sorted by (subfolder, filename), plus a status string.
+        A cold start waits at most COLD_START_WAIT seconds and may return a partial listing
+        """
+        root = os.path.abspath(resolve_folder(folder_path))
+        if not os.path.isdir(root):
+            return (), "Folder not found"
+
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT complete FROM roots WHERE root = ?", (root,)).fetchone()
+        finally:
+            conn.close()
+        complete = row is not None and row[0] == 1
+
+        thread = self._start_refresh(root, force=not complete)
+        if not complete and thread is not None:
+            thread.join(COLD_START_WAIT)
+
+        with self._lock:
+            building = root in self._threads and not complete
+            listing = self._listings.get(root)
+        if listing is None or building:
+            listing = self._load_listing(root)
+            with self._lock:
+                self._listings[root] = listing
+
+        if building:
+            return listing, f"Indexing in progress ({len(listing)} videos so far)"
+        return listing, "Index up to date"
+
+    def _start_refresh(self, root: str, force: bool) -> Optional[threading.Thread]:
+        with self._lock:
+            thread = self._threads.get(root)
+            if thread is not None:
+                return thread
+            last = self._last_refresh.get(root)
+            if not force and last is not None and time.monotonic() - last < REFRESH_INTERVAL:
+                return None
+            thread = threading.Thread(target=self._refresh, args=(root,), daemon=True,
+                                      name=f"video-index-{os.path.basename(root)}")
+            self._threads[root] = thread
+        thread.start()
+        return thread
+
+    def _refresh(self, root: str):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT complete FROM roots WHERE root = ?", (root,)).fetchone()
+            if row is None or row[0] != 1:
+                changed = self._build(conn, root)
+            else:
+                changed = self._update(conn, root)
+            if changed:
+                listing = self._load_listing(root, conn)
+                with self._lock:
+                    self._listings[root] = listing
+        except Exception as e:
+            print(f"Error indexing video folder {root}: {str(e)}")
+        finally:
+            conn.close()
+            with self._lock:
+                self._threads.pop(root, None)
+                self._last_refresh[root] = time.monotonic()
+
+    def _scan_dir(self, conn: sqlite3.Connection, root: str, rel_dir: str) -> List[str]:
+        """Record one directory's mtime and video files, return its subdirectories"""
+        full_dir = os.path.join(root, rel_dir) if rel_dir else root
+        # Take the mtime before listing so changes made during the scan are picked up next time
+        mtime_ns = os.stat(full_dir).st_mtime_ns
+        names = []
+        subdirs = []
+        with os.scandir(full_dir) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(os.path.join(rel_dir, entry.name) if rel_dir else entry.name)
+                elif is_video_file(entry.name) and entry.is_file():
+                    names.append(entry.name)
+
+        conn.execute("DELETE FROM files WHERE root = ? AND dir = ?", (root, rel_dir))
+        conn.executemany("INSERT INTO files (root, dir, name) VALUES (?, ?, ?)",
+                         [(root, rel_dir, name) for name in names])
+        conn.execute("INSERT OR REPLACE INTO dirs (root, path, mtime_ns) VALUES (?, ?, ?)",
+                     (root, rel_dir, mtime_ns))
+        return subdirs
+
+    def _walk(self, conn: sqlite3.Connection, root: str, start: str):
+        """Scan start and everything below it"""
+        pending = [start]
+        scanned = 0
+        while pending:
+            rel_dir = pending.pop()
+            try:
+                pending.extend(self._scan_dir(conn, root, rel_dir))
+            except OSError:
+                continue
+            scanned += 1
+            if scanned % COMMIT_EVERY_DIRS == 0:
+                conn.commit()
+
+    def _build(self, conn: sqlite3.Connection, root: str) -> bool:
+        """Full walk for a tree that has no complete index yet"""
+        conn.execute("DELETE FROM files WHERE root = ?", (root,))
+        conn.execute("DELETE FROM dirs WHERE root = ?", (root,))
+        conn.execute("INSERT OR REPLACE INTO roots (root, complete) VALUES (?, 0)", (root,))
+        conn.commit()
+
+        self._walk(conn, root, "")
+
+        conn.execute("UPDATE roots SET complete = 1 WHERE root = ?", (root,))
+        conn.commit()
+        return True
+
+    def _update(self, conn: sqlite3.Connection, root: str) -> bool:
+        """Stat every known directory and rescan only the ones whose mtime changed"""
+        known = dict(conn.execute("SELECT path, mtime_ns FROM dirs WHERE root = ?", (root,)))
+        changed = False
+        for rel_dir, mtime_ns in known.items():
+            full_dir = os.path.join(root, rel_dir) if rel_dir else root
+            try:
+                current = os.stat(full_dir).st_mtime_ns
+            except OSError:
+                # Directory is gone, its descendants are handled on their own
+                conn.execute("DELETE FROM files WHERE root = ? AND dir = ?", (root, rel_dir))
+                conn.execute("DELETE FROM dirs WHERE root = ? AND path = ?", (root, rel_dir))
+                changed = True
+                continue
+            if current == mtime_ns:
+                continue
+
+            changed = True
+            for subdir in self._scan_dir(conn, root, rel_dir):
+                # New subdirectories get walked in full
+                if subdir not in known:
+                    self._walk(conn, root, subdir)
+        conn.commit()
+        return changed
+
+    def _load_listing(self, root: str, conn: Optional[sqlite3.Connection] = None) -> Tuple[str, ...]:
+        own_conn = conn is None
+        if own_conn:
+            conn = self._connect()
+        try:
+            rows = conn.execute("SELECT dir, name FROM files WHERE root = ? ORDER BY dir, name", (root,)).fetchall()
+        finally:
+            if own_conn:
+                conn.close()
+        return tuple(os.path.join(root, rel_dir, name) if rel_dir else os.path.join(root, name)
+                     for rel_dir, name in rows)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {root: len(listing) for root, listing in self._listings.items()}
+
+
+# Shared by both video loaders
+RECURSIVE_VIDEO_INDEX = RecursiveVideoIndex()
@@ -0,0 +1,192 @@
+import hashlib
+import math
+import random
+from typing import List, Optional
+
+
+# Philox4x32-10 constants
+PHILOX_M0 = 0xD2511F53
+PHILOX_M1 = 0xCD9E8D57
+PHILOX_W0 = 0x9E3779B9
+PHILOX_W1 = 0xBB67AE85
+MASK32 = 0xFFFFFFFF
+
+
+def philox4x32(counter, key):
+    """Philox4x32-10 block function: maps a 4x32-bit counter and 2x32-bit key to 4 random words"""
+    c0, c1, c2, c3 = counter
+    k0, k1 = key
+    for _ in range(10):
+        p0 = PHILOX_M0 * c0
+        p1 = PHILOX_M1 * c2
+        c0, c1, c2, c3 = ((p1 >> 32) ^ c1 ^ k0) & MASK32, p1 & MASK32, ((p0 >> 32) ^ c3 ^ k1) & MASK32, p0 & MASK32
+        k0 = (k0 + PHILOX_W0) & MASK32
+        k1 = (k1 + PHILOX_W1) & MASK32
+    return (c0, c1, c2, c3)
+
+
+def derive_key(stream: str, seed: int):
+    """Derive a 64-bit Philox key from a stream name and a seed"""
+    digest = hashlib.blake2b(f"{stream}:{seed}".encode("utf-8"), digest_size=8).digest()
+    value = int.from_bytes(digest, "little")
+    return (value & MASK32, value >> 32)
+
+
+class CounterRandom(random.Random):
+    """
+    random.Random backed by a counter-based Philox stream.
+    Every (stream, seed, index) triple is its own independent sequence, so nodes
+    don't share the global random state and item k can be computed directly
+    """
+
+    def __init__(self, seed: Optional[int] = None, stream: str = "", index: int = 0):
+        self.stream = stream
+        self.index = index
+        super().__init__(seed)
+
+    def seed(self, a=None, version=2):
+        if a is None:
+            a = random.SystemRandom().getrandbits(64)
+        self.seed_value = a
+        self._key = derive_key(self.stream, a)
+        self._block = 0
+        self._words = []
+        self.gauss_next = None
+
+    def _next_word(self) -> int:
+        if not self._words:
+            counter = (self._block & MASK32, (self._block >> 32) & MASK32,
+                       self.index & MASK32, (self.index >> 32) & MASK32)
+            self._words = list(philox4x32(counter, self._key))
+            self._block += 1
+        return self._words.pop()
+
+    def getrandbits(self, k: int) -> int:
+        if k < 0:
+            raise ValueError("number of bits must be non-negative")
+        value = 0
+        bits = 0
+        while bits < k:
+            value |= self._next_word() << bits
+            bits += 32
+        return value & ((1 << k) - 1) if k else 0
+
+    def random(self) -> float:
+        return self.getrandbits(53) * (1.0 / (1 << 53))
+
+    def getstate(self):
+        return (self.stream, self.seed_value, self.index, self._block, tuple(self._words), self.gauss_next)
+
+    def setstate(self, state):
+        self.stream, seed_value, self.index, self._block, words, self.gauss_next = state
+        self.seed_value = seed_value
+        self._key = derive_key(self.stream, seed_value)
+        self._words = list(words)
+
+
+def node_rng(node_name: str, seed: Optional[int], randomize: bool = False, node_id=None) -> CounterRandom:
+    """
+    Private random stream for a node: fresh entropy when randomize is set, else derived from
+    seed. node_id (the UNIQUE_ID hidden input) keeps two nodes of one type with the same seed apart
+    """
+    if randomize:
+        seed = None
+    stream = node_name if node_id is None else f"{node_name}:{node_id}"
+    return CounterRandom(seed, stream)
+
+
+class FeistelPermutation:
+    """
+    Seeded pseudorandom permutation of [0, n) computed one element at a time.
+    A balanced Feistel network over the smallest even bit width covering n, with
+    cycle walking to stay inside the range, so lookups need O(1) memory.
+    Halves up to 32 bits use Philox rounds; wider ones (n above 2**64) use keyed BLAKE2b
+    """
+
+    ROUNDS = 6
+    MAX_HALF_BITS = 256
+
+    def __init__(self, n: int, seed: int, stream: str = "permutation"):
+        bits = max(2, (n - 1).bit_length()) if n > 0 else 2
+        bits += bits & 1
+        if n < 0 or bits // 2 > self.MAX_HALF_BITS:
+            raise ValueError(f"permutation size must be between 0 and 2**{2 * self.MAX_HALF_BITS}")
+        self.n = n
+        self.half_bits = bits // 2
+        self.half_mask = (1 << self.half_bits) - 1
+        self._key = derive_key(stream, seed)
+        self._hash_key = hashlib.blake2b(f"{stream}:{seed}".encode("utf-8"), digest_size=32).digest()
+        self._half_bytes = (self.half_bits + 7) // 8
+
+    def __len__(self):
+        return self.n
+
+    def _round(self, value: int, round_index: int) -> int:
+        if self.half_bits <= 32:
+            return philox4x32((value, round_index, 0, 0), self._key)[0] & self.half_mask
+        digest = hashlib.blake2b(value.to_bytes(self._half_bytes, "little") + bytes([round_index]),
+                                 key=self._hash_key, digest_size=self._half_bytes).digest()
+        return int.from_bytes(digest, "little") & self.half_mask
+
+    def _encrypt(self, x: int) -> int:
+        left, right = x >> self.half_bits, x & self.half_mask
+        for r in range(self.ROUNDS):
+            left, right = right, left ^ self._round(right, r)
+        return (left << self.half_bits) | right
+
+    def _decrypt(self, x: int) -> int:
+        left, right = x >> self.half_bits, x & self.half_mask
+        for r in reversed(range(self.ROUNDS)):
+            left, right = right ^ self._round(left, r), left
+        return (left << self.half_bits) | right
+
+    def __getitem__(self, index: int) -> int:
+        """Position `index` of the permutation"""
+        if not 0 <= index < self.n:
+            raise IndexError("permutation index out of range")
+        # The bit domain is less than 4n, so this takes under 4 steps on average
+        value = self._encrypt(index)
+        while value >= self.n:
+            value = self._encrypt(value)
+        return value
+
+    def index(self, value: int) -> int:
+        """Inverse lookup: the position at which `value` appears"""
+        if not 0 <= value < self.n:
+            raise ValueError("value out of range")
+        index = self._decrypt(value)
+        while index >= self.n:
+            index = self._decrypt(index)
+        return index
+
+
+def unrank_combination(rank: int, n: int, k: int) -> List[int]:
+    """
+    The rank-th k-subset of range(n) in colexicographic order, as ascending indices.
+    Uses the combinatorial number system: one binary search over binomials per element,
+    so it needs no enumeration and O(k log n) binomial evaluations
+    """
+    total = math.comb(n, k)
+    if not 0 <= rank < total:
+        raise ValueError("combination rank out of range")
+    indices = []
+    upper = n
+    for i in range(k, 0, -1):
+        # Largest c < upper with comb(c, i) <= rank
+        lo, hi = i - 1, upper - 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if math.comb(mid, i) <= rank:
+                lo = mid
+            else:
+                hi = mid - 1
+        indices.append(lo)
+        rank -= math.comb(lo, i)
+        upper = lo
+    indices.reverse()
+    return indices
+
+
+def unrank_multiset(rank: int, n: int, k: int) -> List[int]:
+    """The rank-th size-k multiset of range(n) (combination with repetition), ascending"""
+    return [c - i for i, c in enumerate(unrank_combination(rank, n + k - 1, k))]
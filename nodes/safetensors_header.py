@@ -0,0 +1,255 @@
+import json
+import os
+import re
+import struct
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import folder_paths
+
+from .lora_stack import LoraStack
+
+
+class LoraFileInfo(NamedTuple):
+    """What a LoRA file's safetensors header says about it, without loading any tensors"""
+    path: Optional[str]
+    size_bytes: int = 0
+    tensor_bytes: int = 0  # Size of the tensor data, what loading the LoRA costs in memory
+    rank: int = 0
+    key_prefixes: Tuple[str, ...] = ()
+    architecture: str = "unknown"  # sd15, sd2, sdxl, sd3, flux or unknown
+    metadata: Optional[Dict[str, str]] = None
+    error: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return not self.error
+
+
+ARCHITECTURES = ["sd15", "sd2", "sdxl", "sd3", "flux"]
+MAX_HEADER_BYTES = 100 * 1024 * 1024
+
+# Down projections (rank x input dim) in kohya, diffusers and PEFT key styles
+LORA_DOWN_SUFFIXES = ("lora_down.weight", "lora.down.weight", "lora_A.weight")
+
+# Cross-attention context width of the UNet, from attn2 to_k input dims
+CONTEXT_DIM_ARCHITECTURES = {768: "sd15", 1024: "sd2", 2048: "sdxl"}
+
+
+def read_safetensors_header(path: str) -> Tuple[dict, dict]:
+    """(tensor entries, __metadata__) from a safetensors file, reading only its JSON header"""
+    with open(path, 'rb') as f:
+        prefix = f.read(8)
+        if len(prefix) != 8:
+            raise ValueError("file is too small to be safetensors")
+        header_size = struct.unpack("<Q", prefix)[0]
+        if header_size > MAX_HEADER_BYTES:
+            raise ValueError("header is too large, not a safetensors file")
+        header = json.loads(f.read(header_size))
+    if not isinstance(header, dict):
+        raise ValueError("header is not a JSON object")
+    metadata = header.pop("__metadata__", None) or {}
+    return header, metadata
+
+
+def architecture_from_metadata(metadata: dict) -> str:
+    """Base model from kohya ss_base_model_version or modelspec.architecture, if present"""
+    text = (metadata.get("modelspec.architecture") or metadata.get("ss_base_model_version") or "").lower()
+    if not text:
+        return "unknown"
+    if "flux" in text:
+        return "flux"
+    if "xl" in text:
+        return "sdxl"
+    if "v3" in text or "sd3" in text:
+        return "sd3"
+    if re.search(r"v2|sd_?2", text):
+        return "sd2"
+    if re.search(r"v1|sd_?1", text):
+        return "sd15"
+    return "unknown"
+
+
+def architecture_from_keys(tensors: dict) -> str:
+    """Base model guessed from key names and the cross-attention context width"""
+    keys = tensors.keys()
+    if any("double_blocks" in key or "single_transformer_blocks" in key or "single_blocks" in key for key in keys):
+        return "flux"
+    if any("joint_blocks" in key for key in keys):
+        return "sd3"
+    if any(key.startswith("lora_te2_") for key in keys):
+        return "sdxl"
+    for key, entry in tensors.items():
+        if "attn2" in key and "to_k" in key and key.endswith(LORA_DOWN_SUFFIXES):
+            shape = entry.get("shape") or []
+            if len(shape) >= 2:
+                return CONTEXT_DIM_ARCHITECTURES.get(shape[1], "unknown")
+    return "unknown"
+
+
+def key_prefix(key: str) -> str:
+    prefix = key.split('.', 1)[0]
+    if prefix.startswith("lora_"):
+        # Kohya keys: lora_unet_..., lora_te1_..., lora_te_...
+        return '_'.join(prefix.split('_')[:2])
+    return prefix
+
+
+def inspect_lora_file(path: str) -> LoraFileInfo:
+    """Header-only inspection: size, rank, key prefixes and base model of a LoRA file"""
+    size = os.path.getsize(path)
+    if not path.lower().endswith(".safetensors"):
+        # Pickled checkpoints can't be inspected without loading them
+        return LoraFileInfo(path=path, size_bytes=size, tensor_bytes=size)
+
+    tensors, metadata = read_safetensors_header(path)
+    if not tensors:
+        return LoraFileInfo(path=path, size_bytes=size, metadata=metadata, error="has no tensors")
+
+    rank = 0
+    for key, entry in tensors.items():
+        if key.endswith(LORA_DOWN_SUFFIXES):
+            shape = entry.get("shape") or []
+            if shape:
+                rank = shape[0]
+                break
+
+    architecture = architecture_from_metadata(metadata)
+    if architecture == "unknown":
+        architecture = architecture_from_keys(tensors)
+
+    tensor_bytes = max((entry.get("data_offsets") or [0, 0])[1] for entry in tensors.values())
+    prefixes = tuple(sorted({key_prefix(key) for key in tensors}))
+    return LoraFileInfo(path=path, size_bytes=size, tensor_bytes=tensor_bytes, rank=rank, key_prefixes=prefixes,
+                        architecture=architecture, metadata=metadata)
+
+
+# Inspected files keyed by path, validated by (mtime, size)
+MAX_CACHED_FILES = 4096
+_file_cache = OrderedDict()  # path -> (mtime_ns, size, LoraFileInfo)
+_lock = threading.Lock()
+
+
+def lora_file_info(lora_name: str) -> LoraFileInfo:
+    """Cached header info for a LoRA by its name in the loras folder"""
+    path = folder_paths.get_full_path("loras", lora_name)
+    if path is None:
+        return LoraFileInfo(path=None, error="file not found")
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return LoraFileInfo(path=path, error="file not found")
+    fingerprint = (stat.st_mtime_ns, stat.st_size)
+
+    with _lock:
+        cached = _file_cache.get(path)
+        if cached is not None and cached[:2] == fingerprint:
+            _file_cache.move_to_end(path)
+            return cached[2]
+
+    try:
+        info = inspect_lora_file(path)
+    except (OSError, ValueError, struct.error) as e:
+        info = LoraFileInfo(path=path, size_bytes=stat.st_size, error=f"unreadable header ({str(e)})")
+
+    with _lock:
+        _file_cache[path] = fingerprint + (info,)
+        _file_cache.move_to_end(path)
+        while len(_file_cache) > MAX_CACHED_FILES:
+            _file_cache.popitem(last=False)
+    return info
+
+
+def model_architecture(model) -> str:
+    """Base model family of a ComfyUI MODEL, from its model config class"""
+    try:
+        config_name = type(model.model.model_config).__name__.lower()
+    except AttributeError:
+        return "unknown"
+    if config_name.startswith("flux"):
+        return "flux"
+    if config_name.startswith("sd3"):
+        return "sd3"
+    if config_name.startswith("sdxl") or config_name in ("ssd1b", "segmind_vega", "koala_700m", "koala_1b"):
+        return "sdxl"
+    if config_name.startswith(("sd20", "sd21")):
+        return "sd2"
+    if config_name.startswith("sd15"):
+        return "sd15"
+    return "unknown"
+
+
+def lora_problem(lora_name: str, architecture: str = "unknown") -> str:
+    """Why a LoRA can't be used (empty string when it looks fine)"""
+    info = lora_file_info(lora_name)
+    if info.error:
+        return f"{lora_name}: {info.error}"
+    if architecture != "unknown" and info.architecture != "unknown" and info.architecture != architecture:
+        return f"{lora_name}: made for {info.architecture}, model is {architecture}"
+    return ""
+
+
+def preflight_names(names: Iterable[str], architecture: str = "unknown") -> Tuple[List[str], List[str]]:
+    """(usable names, problem descriptions) for a list of LoRA names"""
+    usable = []
+    problems = []
+    for name in names:
+        problem = lora_problem(name, architecture)
+        if problem:
+            problems.append(problem)
+        else:
+            usable.append(name)
+    return usable, problems
+
+
+# Node input: "off" skips the check, "any" only checks files, an architecture also checks compatibility
+PREFLIGHT_CHOICES = ["off", "any"] + ARCHITECTURES
+
+
+def preflight_input(default: str, auto: bool = False):
+    choices = (["off", "auto"] + PREFLIGHT_CHOICES[1:]) if auto else PREFLIGHT_CHOICES
+    tooltip = ("Check LoRA files before use by reading their safetensors header. Missing, unreadable or "
+               "incompatible LoRAs are skipped. 'any' only checks the files")
+    if auto:
+        tooltip += ", 'auto' also matches the base model of the connected model"
+    return (choices, {"default": default, "tooltip": tooltip})
+
+
+def preflight_architecture(setting: str, model=None) -> Optional[str]:
+    """Architecture to check against for a preflight setting, or None when preflight is off"""
+    if setting == "off":
+        return None
+    if setting == "auto":
+        return model_architecture(model) if model is not None else "unknown"
+    if setting == "any":
+        return "unknown"
+    return setting
+
+
+def preflight_stack(lora_stack, architecture: Optional[str]):
+    """
+    Drop unusable entries from a LORA_STACK. Returns (stack, problems); the same stack
+    object is returned when nothing had to be removed
+    """
+    if architecture is None or not lora_stack:
+        return lora_stack, []
+    problems = []
+    bad = set()
+    for entry in lora_stack:
+        problem = lora_problem(entry[0], architecture)
+        if problem:
+            bad.add(entry[0])
+            problems.append(problem)
+    if not bad:
+        return lora_stack, []
+    kept = [entry for entry in lora_stack if entry[0] not in bad]
+    if isinstance(lora_stack, LoraStack):
+        return LoraStack(kept, lora_stack.policy), problems
+    return kept, problems
+
+
+def problems_text(problems: List[str]) -> str:
+    if not problems:
+        return ""
+    return f"Skipped {len(problems)} LoRA(s):\n" + '\n'.join(problems)
@@ -0,0 +1,98 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+import folder_paths
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of this process are serialized
+    fcntl = None
+
+
+class JsonStateFile:
+    """
+    Small JSON dict in the user directory that several worker processes may share.
+    Reads are cached and only re-parsed when the file's (mtime, size) changes; update()
+    re-reads and rewrites it under an exclusive file lock, so concurrent writers don't
+    overwrite each other's changes
+    """
+
+    def __init__(self, filename: str, path: Optional[str] = None):
+        self.filename = filename
+        self._path = path
+        self._lock = threading.Lock()
+        self._data = None
+        self._fingerprint = None  # (path, mtime_ns, size) of the file _data came from
+
+    def path(self) -> str:
+        if self._path is not None:
+            return self._path
+        return os.path.join(folder_paths.get_user_directory(), "simple_random_lora", self.filename)
+
+    def _stat(self, path: str) -> Optional[Tuple[str, int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (path, stat.st_mtime_ns, stat.st_size)
+
+    def _read(self) -> dict:
+        path = self.path()
+        fingerprint = self._stat(path)
+        if self._data is not None and fingerprint == self._fingerprint:
+            return self._data
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                data = {}
+        except (OSError, ValueError):
+            data = {}
+        self._data, self._fingerprint = data, fingerprint
+        return data
+
+    def read(self) -> dict:
+        """Current contents; treat as read-only"""
+        with self._lock:
+            return self._read()
+
+    @contextmanager
+    def _file_lock(self, path: str):
+        if fcntl is None:
+            yield
+            return
+        with open(f"{path}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def update(self):
+        """Yield the freshly read contents for changing in place, then save them"""
+        path = self.path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._lock, self._file_lock(path):
+            data = self._read()
+            try:
+                yield data
+            except BaseException:
+                # The cached copy may be half-changed, re-read it next time
+                self._data = None
+                raise
+            try:
+                self._save(path, data)
+            except OSError as e:
+                print(f"Could not save {self.filename}: {str(e)}")
+
+    def _save(self, path: str, data: dict):
+        """Write atomically so a crash never leaves a half-written file"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+        self._data, self._fingerprint = data, self._stat(path)
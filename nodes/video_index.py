@@ -0,0 +1,208 @@
+import bisect
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import folder_paths
+
+from .rng import FeistelPermutation
+from .state_file import JsonStateFile
+
+
+# Common video file extensions
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.webm', '.flv', '.wmv', '.m4v', '.mpg', '.mpeg', '.3gp', '.ts'}
+
+_lock = threading.Lock()
+_folder_cache = {}  # full_path -> (dir mtime_ns, sorted video paths)
+
+
+def resolve_folder(folder_path: str) -> str:
+    """Turn a node folder_path (relative to the input directory, or absolute) into a full path"""
+    # Handle relative paths (relative to input directory)
+    if not os.path.isabs(folder_path):
+        if folder_path.startswith("input/") or folder_path.startswith("input\\"):
+            # Remove "input/" prefix and join with input directory
+            relative_path = folder_path[6:]  # Remove "input/"
+            return os.path.join(folder_paths.get_input_directory(), relative_path)
+        elif folder_path == "input":
+            return folder_paths.get_input_directory()
+        else:
+            return os.path.join(folder_paths.get_input_directory(), folder_path)
+    return folder_path
+
+
+def is_video_file(filename: str) -> bool:
+    _, ext = os.path.splitext(filename.lower())
+    return ext in VIDEO_EXTENSIONS
+
+
+def scan_folder(full_path: str) -> Tuple[str, ...]:
+    """Sorted video paths directly inside full_path, using the file type from scandir (no extra stats)"""
+    with os.scandir(full_path) as entries:
+        names = [entry.name for entry in entries if is_video_file(entry.name) and entry.is_file()]
+    names.sort()
+    return tuple(os.path.join(full_path, name) for name in names)
+
+
+def list_videos(folder_path: str) -> Tuple[str, ...]:
+    """
+    Sorted video files in a folder. The listing is cached and only rescanned when the
+    directory's mtime changes
+    """
+    full_path = resolve_folder(folder_path)
+
+    try:
+        mtime_ns = os.stat(full_path).st_mtime_ns
+    except OSError:
+        return ()
+
+    with _lock:
+        cached = _folder_cache.get(full_path)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+
+    try:
+        videos = scan_folder(full_path)
+    except Exception as e:
+        print(f"Error reading folder {full_path}: {str(e)}")
+        return ()
+
+    with _lock:
+        _folder_cache[full_path] = (mtime_ns, videos)
+    return videos
+
+
+# Shuffled iteration. Each epoch is a seeded permutation of the listing as it was when the
+# epoch started, so files added mid-epoch only join at the next epoch. Files that disappear
+# mid-epoch are dropped from it: their permutation slots are recorded and skipped, so every
+# remaining file still comes up exactly once. The state of every walk is persisted, with the
+# epoch's listing in its own file, so a restart continues the epoch instead of reshuffling.
+MAX_SHUFFLE_WALKS = 256
+MAX_CACHED_SNAPSHOTS = 16
+_shuffle_state = JsonStateFile("video_shuffle.json")
+_snapshots = OrderedDict()  # snapshot hash -> listing tuple
+
+
+def _walk_key(folder_key, seed: int) -> str:
+    return hashlib.sha1(repr((folder_key, seed)).encode("utf-8")).hexdigest()
+
+
+def _snapshot_path(snapshot_hash: str) -> str:
+    return os.path.join(os.path.dirname(_shuffle_state.path()), "video_shuffle", f"{snapshot_hash}.json")
+
+
+def _store_snapshot(videos: Tuple[str, ...]) -> str:
+    snapshot_hash = hashlib.sha1("\n".join(videos).encode("utf-8")).hexdigest()
+    path = _snapshot_path(snapshot_hash)
+    if not os.path.isfile(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(list(videos), f)
+        os.replace(tmp_path, path)
+    with _lock:
+        _snapshots[snapshot_hash] = videos
+    return snapshot_hash
+
+
+def _load_snapshot(snapshot_hash: str) -> Optional[Tuple[str, ...]]:
+    with _lock:
+        videos = _snapshots.get(snapshot_hash)
+        if videos is not None:
+            _snapshots.move_to_end(snapshot_hash)
+            return videos
+    try:
+        with open(_snapshot_path(snapshot_hash), 'r', encoding='utf-8') as f:
+            videos = tuple(json.load(f))
+    except (OSError, ValueError, TypeError):
+        return None
+    with _lock:
+        _snapshots[snapshot_hash] = videos
+        while len(_snapshots) > MAX_CACHED_SNAPSHOTS:
+            _snapshots.popitem(last=False)
+    return videos
+
+
+def _walk_index(position: int, skipped: List[int]) -> int:
+    """Permutation slot of the position-th file of an epoch, stepping over skipped slots"""
+    index = position
+    for slot in skipped:  # sorted
+        if slot > index:
+            break
+        index += 1
+    return index
+
+
+def _advance(state: dict, snapshot: Tuple[str, ...], videos: Tuple[str, ...], seed: int,
+             loop_count: int) -> Tuple[Optional[str], Tuple[str, ...]]:
+    """Move state to the epoch holding loop_count and find its file; (None, ...) when no file is left"""
+    while True:
+        length = len(snapshot) - len(state["skipped"])
+        if loop_count >= state["start"] + length:
+            # Epoch boundary, pick up the current listing
+            if not videos:
+                return None, snapshot
+            state.update(epoch=state["epoch"] + 1, start=state["start"] + length, skipped=[])
+            snapshot = videos
+            # Later epochs all start from this listing, jump straight to the one holding loop_count
+            jump = (loop_count - state["start"]) // len(videos)
+            state["epoch"] += jump
+            state["start"] += jump * len(videos)
+            continue
+
+        index = _walk_index(loop_count - state["start"], state["skipped"])
+        permutation = FeistelPermutation(len(snapshot), seed, f"video_shuffle:{state['epoch']}")
+        path = snapshot[permutation[index]]
+        if os.path.isfile(path):
+            return path, snapshot
+        # Removed since the epoch started, drop it from the epoch
+        bisect.insort(state["skipped"], index)
+
+
+def shuffled_video(folder_key, videos: Tuple[str, ...], seed: int, loop_count: int,
+                   update: bool = True) -> Optional[Tuple[str, int, int, int]]:
+    """
+    (video path, position in epoch, files in epoch, epoch) for loop_count in a shuffled walk
+    over videos that visits every file exactly once per epoch, or None when none of the
+    files exist any more. update=False looks ahead without moving the stored walk
+    """
+    key = _walk_key(folder_key, seed)
+    stored = _shuffle_state.read().get(key)
+    snapshot = _load_snapshot(stored["snapshot"]) if stored is not None else None
+    if snapshot is None or loop_count < stored["start"]:
+        # Nothing to continue from: align epochs to the current listing
+        if not videos:
+            return None
+        epoch, offset = divmod(loop_count, len(videos))
+        state = {"epoch": epoch, "start": loop_count - offset, "skipped": []}
+        snapshot = videos
+    else:
+        state = {"epoch": stored["epoch"], "start": stored["start"], "skipped": list(stored["skipped"])}
+
+    path, snapshot = _advance(state, snapshot, videos, seed, loop_count)
+    if path is None:
+        return None
+
+    if update:
+        state["snapshot"] = _store_snapshot(snapshot)
+        with _shuffle_state.update() as walks:
+            old = walks.get(key)
+            state["updated"] = time.time()
+            walks[key] = state
+            if len(walks) > MAX_SHUFFLE_WALKS:
+                for stale in sorted(walks, key=lambda k: walks[k].get("updated", 0))[:len(walks) - MAX_SHUFFLE_WALKS]:
+                    del walks[stale]
+            if old is not None and old["snapshot"] != state["snapshot"]:
+                # The previous epoch's listing is no longer needed unless another walk uses it
+                if all(walk["snapshot"] != old["snapshot"] for walk in walks.values()):
+                    try:
+                        os.remove(_snapshot_path(old["snapshot"]))
+                    except OSError:
+                        pass
+
+    length = len(snapshot) - len(state["skipped"])
+    return path, loop_count - state["start"], length, state["epoch"]
@@ -1,6 +1,23 @@
 import os
-import folder_paths
-from typing import List
+from .listings import timed_input_types
+from .recursive_video_index import RECURSIVE_VIDEO_INDEX
+from .video_index import VIDEO_EXTENSIONS, list_videos, resolve_folder, shuffled_video
+from .video_metadata import EMPTY_METADATA, video_metadata
+from .video_prefetch import VIDEO_PREFETCHER
+from typing import List, Tuple
+
+
+RECURSIVE_INPUT = ("BOOLEAN", {
+    "default": False,
+    "tooltip": "Include videos in all subfolders. Uses a persistent index that is built in the background on first use"
+})
+
+
+def find_videos(folder_path: str, recursive: bool) -> Tuple[Tuple[str, ...], str]:
+    """Video paths for a folder plus an index status string (empty unless recursive)"""
+    if recursive:
+        return RECURSIVE_VIDEO_INDEX.list_videos(folder_path)
+    return list_videos(folder_path), ""
 
 
 class SimpleVideoIndexLoader:
@@ -9,33 +26,11 @@ class SimpleVideoIndexLoader:
     """
     
     # Common video file extensions
-    VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.webm', '.flv', '.wmv', '.m4v', '.mpg', '.mpeg', '.3gp', '.ts'}
+    VIDEO_EXTENSIONS = VIDEO_EXTENSIONS
     
     @classmethod
+    @timed_input_types
     def INPUT_TYPES(cls):
-        # Get available folders - you can customize this to your needs
-        input_dir = folder_paths.get_input_directory()
-        folders = ["input"]  # Default to input folder
-        
-        # Optionally add other common folders
-        try:
-            # Add subdirectories of input folder
-            if os.path.exists(input_dir):
-                subdirs = [d for d in os.listdir(input_dir) 
-                          if os.path.isdir(os.path.join(input_dir, d))]
-                folders.extend([f"input/{subdir}" for subdir in subdirs])
-        except:
-            pass
-            
-        # Add some common video folders if they exist
-        for folder_name in ["videos", "movies", "clips"]:
-            folder_path = os.path.join(folder_paths.get_input_directory(), folder_name)
-            if os.path.exists(folder_path):
-                folders.append(f"input/{folder_name}")
-        
-        if not folders:
-            folders = ["input"]
-            
         return {
             "required": {
                 "folder_path": ("STRING", {
@@ -45,7 +40,7 @@ class SimpleVideoIndexLoader:
                 "video_index": ("INT", {
                     "default": 0, 
                     "min": 0, 
-                    "max": 10000, 
+                    "max": 0xffffffffffffffff, 
                     "step": 1,
                     "tooltip": "Index of video file to select (0-based)"
                 }),
@@ -53,54 +48,31 @@ class SimpleVideoIndexLoader:
                     "default": True,
                     "tooltip": "If True, index wraps around when it exceeds number of videos"
                 }),
+            },
+            "optional": {
+                "recursive": RECURSIVE_INPUT,
             }
         }
     
-    RETURN_TYPES = ("STRING", "STRING", "INT", "INT")
-    RETURN_NAMES = ("video_path", "video_filename", "current_index", "total_videos")
+    RETURN_TYPES = ("STRING", "STRING", "INT", "INT", "FLOAT", "FLOAT", "INT", "INT", "INT")
+    RETURN_NAMES = ("video_path", "video_filename", "current_index", "total_videos",
+                    "duration", "fps", "width", "height", "frame_count")
     
     FUNCTION = "get_video_path"
     CATEGORY = "Video Loader"
     
     def get_video_files(self, folder_path: str) -> List[str]:
         """Get all video files from the specified folder"""
-        video_files = []
-        
-        # Handle relative paths (relative to input directory)
-        if not os.path.isabs(folder_path):
-            if folder_path.startswith("input/") or folder_path.startswith("input\\"):
-                # Remove "input/" prefix and join with input directory
-                relative_path = folder_path[6:]  # Remove "input/"
-                full_path = os.path.join(folder_paths.get_input_directory(), relative_path)
-            elif folder_path == "input":
-                full_path = folder_paths.get_input_directory()
-            else:
-                full_path = os.path.join(folder_paths.get_input_directory(), folder_path)
-        else:
-            full_path = folder_path
-        
-        try:
-            if os.path.exists(full_path) and os.path.isdir(full_path):
-                for filename in sorted(os.listdir(full_path)):
-                    file_path = os.path.join(full_path, filename)
-                    if os.path.isfile(file_path):
-                        # Check if file has video extension
-                        _, ext = os.path.splitext(filename.lower())
-                        if ext in self.VIDEO_EXTENSIONS:
-                            video_files.append(os.path.join(full_path, filename))
-        except Exception as e:
-            print(f"Error reading folder {full_path}: {str(e)}")
-        
-        return video_files
+        return list(list_videos(folder_path))
     
-    def get_video_path(self, folder_path: str, video_index: int, loop_videos: bool):
+    def get_video_path(self, folder_path: str, video_index: int, loop_videos: bool, recursive: bool = False):
         try:
             # Get all video files from the folder
-            video_files = self.get_video_files(folder_path)
+            video_files, _ = find_videos(folder_path, recursive)
             
             if not video_files:
                 error_msg = f"No video files found in folder: {folder_path}"
-                return (error_msg, "No videos found", 0, 0)
+                return (error_msg, "No videos found", 0, 0) + tuple(EMPTY_METADATA)
             
             total_videos = len(video_files)
             
@@ -116,11 +88,14 @@ class SimpleVideoIndexLoader:
             selected_video_path = video_files[current_index]
             video_filename = os.path.basename(selected_video_path)
             
-            return (selected_video_path, video_filename, current_index, total_videos)
+            # Header-only metadata, cached per file
+            metadata = video_metadata(selected_video_path)
+            
+            return (selected_video_path, video_filename, current_index, total_videos) + tuple(metadata)
             
         except Exception as e:
             error_msg = f"Error loading video: {str(e)}"
-            return (error_msg, "Error", 0, 0)
+            return (error_msg, "Error", 0, 0) + tuple(EMPTY_METADATA)
     
     @classmethod
     def IS_CHANGED(cls, **kwargs):
@@ -134,9 +109,10 @@ class SimpleVideoLoop:
     """
     
     # Common video file extensions
-    VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.webm', '.flv', '.wmv', '.m4v', '.mpg', '.mpeg', '.3gp', '.ts'}
+    VIDEO_EXTENSIONS = VIDEO_EXTENSIONS
     
     @classmethod
+    @timed_input_types
     def INPUT_TYPES(cls):
         return {
             "required": {
@@ -147,75 +123,191 @@ class SimpleVideoLoop:
                 "loop_count": ("INT", {
                     "default": 0, 
                     "min": 0, 
-                    "max": 10000, 
+                    "max": 0xffffffffffffffff, 
                     "step": 1,
                     "tooltip": "Increment this to go to next video"
                 }),
+            },
+            "optional": {
+                "recursive": RECURSIVE_INPUT,
+                "shuffle": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "Visit videos in a seeded random order, each one once per pass. New files join at the next pass"
+                }),
+                "shuffle_seed": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 0xffffffffffffffff,
+                    "tooltip": "Seed for the shuffled order"
+                }),
+                "prefetch_depth": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 64,
+                    "tooltip": "Read the next N videos in the background so they are cached when needed (0 = off)"
+                }),
+                "prefetch_budget_mb": ("INT", {
+                    "default": 2048,
+                    "min": 1,
+                    "max": 65536,
+                    "tooltip": "Maximum megabytes to read ahead"
+                }),
             }
         }
     
-    RETURN_TYPES = ("STRING", "STRING", "STRING")
-    RETURN_NAMES = ("video_path", "video_filename", "loop_info")
+    RETURN_TYPES = ("STRING", "STRING", "STRING", "FLOAT", "FLOAT", "INT", "INT", "INT")
+    RETURN_NAMES = ("video_path", "video_filename", "loop_info", "duration", "fps", "width", "height", "frame_count")
     
     FUNCTION = "loop_video"
     CATEGORY = "Video Loader"
     
     def get_video_files(self, folder_path: str) -> List[str]:
         """Get all video files from the specified folder"""
-        video_files = []
-        
-        # Handle relative paths (relative to input directory)
-        if not os.path.isabs(folder_path):
-            if folder_path.startswith("input/") or folder_path.startswith("input\\"):
-                # Remove "input/" prefix and join with input directory
-                relative_path = folder_path[6:]  # Remove "input/"
-                full_path = os.path.join(folder_paths.get_input_directory(), relative_path)
-            elif folder_path == "input":
-                full_path = folder_paths.get_input_directory()
-            else:
-                full_path = os.path.join(folder_paths.get_input_directory(), folder_path)
-        else:
-            full_path = folder_path
-        
-        try:
-            if os.path.exists(full_path) and os.path.isdir(full_path):
-                for filename in sorted(os.listdir(full_path)):
-                    file_path = os.path.join(full_path, filename)
-                    if os.path.isfile(file_path):
-                        # Check if file has video extension
-                        _, ext = os.path.splitext(filename.lower())
-                        if ext in self.VIDEO_EXTENSIONS:
-                            video_files.append(os.path.join(full_path, filename))
-        except Exception as e:
-            print(f"Error reading folder {full_path}: {str(e)}")
-        
-        return video_files
+        return list(list_videos(folder_path))
     
-    def loop_video(self, folder_path: str, loop_count: int):
+    def loop_video(self, folder_path: str, loop_count: int, recursive: bool = False,
+                   shuffle: bool = False, shuffle_seed: int = 0, prefetch_depth: int = 0,
+                   prefetch_budget_mb: int = 2048):
         try:
             # Get all video files from the folder
-            video_files = self.get_video_files(folder_path)
+            video_files, index_status = find_videos(folder_path, recursive)
             
             if not video_files:
                 error_msg = f"No video files found in folder: {folder_path}"
-                return (error_msg, "No videos found", "No videos in folder")
+                if index_status:
+                    return (error_msg, "No videos found", f"No videos in folder ({index_status})") + tuple(EMPTY_METADATA)
+                return (error_msg, "No videos found", "No videos in folder") + tuple(EMPTY_METADATA)
             
             total_videos = len(video_files)
-            current_index = loop_count % total_videos
             
             # Get the selected video
-            selected_video_path = video_files[current_index]
+            if shuffle:
+                folder_key = (resolve_folder(folder_path), recursive)
+                shuffled = shuffled_video(folder_key, video_files, shuffle_seed, loop_count)
+                if shuffled is None:
+                    error_msg = f"No video files found in folder: {folder_path}"
+                    return (error_msg, "No videos found", "All videos were removed from the folder") + tuple(EMPTY_METADATA)
+                selected_video_path, current_index, total_videos, epoch = shuffled
+            else:
+                current_index = loop_count % total_videos
+                selected_video_path = video_files[current_index]
             video_filename = os.path.basename(selected_video_path)
             
+            # Header-only metadata, cached per file
+            metadata = video_metadata(selected_video_path)
+            
+            # Warm the page cache for the next videos while this one is processed
+            prefetch_info = ""
+            if prefetch_depth > 0:
+                prefetch_info = VIDEO_PREFETCHER.report(selected_video_path)
+                if shuffle:
+                    upcoming = [ahead[0] for ahead in (shuffled_video(folder_key, video_files, shuffle_seed,
+                                                                      loop_count + i, update=False)
+                                                       for i in range(1, prefetch_depth + 1)) if ahead is not None]
+                else:
+                    upcoming = [video_files[(loop_count + i) % len(video_files)] for i in range(1, prefetch_depth + 1)]
+                VIDEO_PREFETCHER.schedule(upcoming, prefetch_budget_mb * 1024 * 1024)
+            
             loop_info = f"Video {current_index + 1} of {total_videos}: {video_filename}"
+            if shuffle:
+                loop_info += f" (shuffled, pass {epoch + 1})"
+            if recursive:
+                loop_info += f"\nFolder: {os.path.dirname(selected_video_path)}\n{index_status}"
+            if metadata.duration:
+                loop_info += f"\n{metadata.width}x{metadata.height}, {metadata.fps:.2f} fps, {metadata.duration:.2f}s ({metadata.frame_count} frames)"
+            if prefetch_info:
+                loop_info += f"\n{prefetch_info}"
             
-            return (selected_video_path, video_filename, loop_info)
+            return (selected_video_path, video_filename, loop_info) + tuple(metadata)
             
         except Exception as e:
             error_msg = f"Error loading video: {str(e)}"
-            return (error_msg, "Error", error_msg)
+            return (error_msg, "Error", error_msg) + tuple(EMPTY_METADATA)
     
     @classmethod
     def IS_CHANGED(cls, **kwargs):
         # Force re-execution when loop_count changes
-        return kwargs.get("loop_count", 0)
\ No newline at end of file
+        return kwargs.get("loop_count", 0)
+
+
+class SimpleVideoIndexBatch:
+    """
+    Batch version of SimpleVideoIndexLoader - resolves a range of indices against one
+    folder scan and returns them as lists
+    """
+    
+    @classmethod
+    @timed_input_types
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "folder_path": ("STRING", {
+                    "default": "input", 
+                    "tooltip": "Folder path relative to ComfyUI input directory, or absolute path"
+                }),
+                "start_index": ("INT", {
+                    "default": 0, 
+                    "min": 0, 
+                    "max": 1000000, 
+                    "step": 1,
+                    "tooltip": "Index of the first video (0-based)"
+                }),
+                "count": ("INT", {
+                    "default": 16, 
+                    "min": 1, 
+                    "max": 100000, 
+                    "step": 1,
+                    "tooltip": "Number of videos to return"
+                }),
+                "stride": ("INT", {
+                    "default": 1, 
+                    "min": 1, 
+                    "max": 10000, 
+                    "step": 1,
+                    "tooltip": "Step between consecutive indices"
+                }),
+                "loop_videos": ("BOOLEAN", {
+                    "default": True,
+                    "tooltip": "If True, indices wrap around; otherwise the list stops at the last video"
+                }),
+            },
+            "optional": {
+                "recursive": RECURSIVE_INPUT,
+            }
+        }
+    
+    RETURN_TYPES = ("STRING", "STRING", "INT", "INT")
+    RETURN_NAMES = ("video_paths", "video_filenames", "indices", "total_videos")
+    OUTPUT_IS_LIST = (True, True, True, False)
+    
+    FUNCTION = "get_video_paths"
+    CATEGORY = "Video Loader"
+    
+    def get_video_paths(self, folder_path: str, start_index: int, count: int, stride: int,
+                        loop_videos: bool, recursive: bool = False):
+        try:
+            # One folder scan for the whole batch
+            video_files, _ = find_videos(folder_path, recursive)
+            
+            if not video_files:
+                error_msg = f"No video files found in folder: {folder_path}"
+                return ([error_msg], ["No videos found"], [0], 0)
+            
+            total_videos = len(video_files)
+            indices = range(start_index, start_index + count * stride, stride)
+            if loop_videos:
+                indices = [index % total_videos for index in indices]
+            else:
+                indices = [index for index in indices if index < total_videos]
+                if not indices:
+                    # Same as the single loader: clamp to the last video
+                    indices = [total_videos - 1]
+            
+            video_paths = [video_files[index] for index in indices]
+            video_filenames = [os.path.basename(path) for path in video_paths]
+            
+            return (video_paths, video_filenames, indices, total_videos)
+            
+        except Exception as e:
+            error_msg = f"Error loading videos: {str(e)}"
+            return ([error_msg], ["Error"], [0], 0)
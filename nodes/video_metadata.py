@@ -0,0 +1,374 @@
+import math
+import os
+import struct
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+
+class VideoMetadata(NamedTuple):
+    """Container-level video properties; zeros when a value isn't available"""
+    duration: float = 0.0
+    fps: float = 0.0
+    width: int = 0
+    height: int = 0
+    frame_count: int = 0
+
+
+EMPTY_METADATA = VideoMetadata()
+
+# moov is normally well under a megabyte, refuse anything absurd
+MAX_MOOV_BYTES = 64 * 1024 * 1024
+# Matroska Info/Tracks elements are small too
+MAX_EBML_ELEMENT_BYTES = 16 * 1024 * 1024
+
+
+# MP4 / MOV (ISO base media file format)
+
+def _iter_boxes(data: bytes, start: int = 0, end: Optional[int] = None):
+    """(type, payload_start, payload_end) for every box in data[start:end]"""
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = struct.unpack_from(">I4s", data, pos)
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                return
+            size = struct.unpack_from(">Q", data, pos + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            return
+        yield box_type, pos + header, pos + size
+        pos += size
+
+
+def _find_box(data: bytes, start: int, end: int, box_type: bytes):
+    for found_type, payload_start, payload_end in _iter_boxes(data, start, end):
+        if found_type == box_type:
+            return payload_start, payload_end
+    return None
+
+
+def _read_moov(f) -> Optional[bytes]:
+    """Find the top-level moov box by seeking over the others (mdat is never read)"""
+    f.seek(0, os.SEEK_END)
+    file_size = f.tell()
+    pos = 0
+    while pos + 8 <= file_size:
+        f.seek(pos)
+        header = f.read(16)
+        if len(header) < 8:
+            return None
+        size, box_type = struct.unpack_from(">I4s", header, 0)
+        header_size = 8
+        if size == 1:
+            if len(header) < 16:
+                return None
+            size = struct.unpack_from(">Q", header, 8)[0]
+            header_size = 16
+        elif size == 0:
+            size = file_size - pos
+        if size < header_size:
+            return None
+        if box_type == b"moov":
+            if size - header_size > MAX_MOOV_BYTES:
+                return None
+            f.seek(pos + header_size)
+            return f.read(size - header_size)
+        pos += size
+    return None
+
+
+def _parse_header_timing(data: bytes, start: int):
+    """(timescale, duration) of an mvhd or mdhd box, which share their leading layout"""
+    # version(1) flags(3), then creation and modification times (64-bit in version 1)
+    if data[start] == 1:
+        return struct.unpack_from(">IQ", data, start + 4 + 16)
+    return struct.unpack_from(">II", data, start + 4 + 8)
+
+
+def _parse_tkhd_size(data: bytes, start: int):
+    """(width, height) from the track header's 16.16 fixed point fields"""
+    offset = start + 4 + (32 if data[start] == 1 else 20)
+    # reserved(8) layer(2) alternate_group(2) volume(2) reserved(2) matrix(36)
+    offset += 52
+    width, height = struct.unpack_from(">II", data, offset)
+    return width >> 16, height >> 16
+
+
+def _parse_stts_frames(data: bytes, start: int) -> int:
+    """Sample count from the time-to-sample table"""
+    entry_count = struct.unpack_from(">I", data, start + 4)[0]
+    frames = 0
+    offset = start + 8
+    for _ in range(entry_count):
+        frames += struct.unpack_from(">I", data, offset)[0]
+        offset += 8
+    return frames
+
+
+def _parse_stsd_size(data: bytes, start: int):
+    """(width, height) from the first visual sample entry"""
+    entry = start + 8
+    # size(4) format(4) reserved(6) data_reference_index(2) pre_defined/reserved(16)
+    return struct.unpack_from(">HH", data, entry + 32)
+
+
+def _video_track(moov: bytes):
+    """(tkhd size, mdhd, stts frames, stsd size) of the first video track"""
+    for box_type, start, end in _iter_boxes(moov):
+        if box_type != b"trak":
+            continue
+        mdia = _find_box(moov, start, end, b"mdia")
+        if mdia is None:
+            continue
+        hdlr = _find_box(moov, mdia[0], mdia[1], b"hdlr")
+        if hdlr is None or moov[hdlr[0] + 8:hdlr[0] + 12] != b"vide":
+            continue
+
+        tkhd = _find_box(moov, start, end, b"tkhd")
+        mdhd = _find_box(moov, mdia[0], mdia[1], b"mdhd")
+        frames = 0
+        stsd_size = (0, 0)
+        minf = _find_box(moov, mdia[0], mdia[1], b"minf")
+        stbl = _find_box(moov, minf[0], minf[1], b"stbl") if minf else None
+        if stbl:
+            stts = _find_box(moov, stbl[0], stbl[1], b"stts")
+            if stts:
+                frames = _parse_stts_frames(moov, stts[0])
+            stsd = _find_box(moov, stbl[0], stbl[1], b"stsd")
+            if stsd:
+                stsd_size = _parse_stsd_size(moov, stsd[0])
+        return (_parse_tkhd_size(moov, tkhd[0]) if tkhd else (0, 0),
+                _parse_header_timing(moov, mdhd[0]) if mdhd else (0, 0),
+                frames, stsd_size)
+    return None
+
+
+def parse_mp4(f) -> VideoMetadata:
+    moov = _read_moov(f)
+    if moov is None:
+        return EMPTY_METADATA
+
+    duration = 0.0
+    mvhd = _find_box(moov, 0, len(moov), b"mvhd")
+    if mvhd:
+        timescale, movie_duration = _parse_header_timing(moov, mvhd[0])
+        if timescale:
+            duration = movie_duration / timescale
+
+    track = _video_track(moov)
+    if track is None:
+        return VideoMetadata(duration=duration)
+
+    (width, height), (media_timescale, media_duration), frames, stsd_size = track
+    if not width or not height:
+        width, height = stsd_size
+    fps = 0.0
+    if media_timescale and media_duration:
+        # The video track's own duration is more accurate than the movie's
+        duration = media_duration / media_timescale
+        fps = frames / duration if frames else 0.0
+    return VideoMetadata(duration=duration, fps=fps, width=width, height=height, frame_count=frames)
+
+
+# Matroska / WebM (EBML)
+
+EBML_HEADER = 0x1A45DFA3
+SEGMENT = 0x18538067
+INFO = 0x1549A966
+TRACKS = 0x1654AE6B
+CLUSTER = 0x1F43B675
+TIMECODE_SCALE = 0x2AD7B1
+DURATION = 0x4489
+TRACK_ENTRY = 0xAE
+TRACK_TYPE = 0x83
+DEFAULT_DURATION = 0x23E383
+VIDEO = 0xE0
+PIXEL_WIDTH = 0xB0
+PIXEL_HEIGHT = 0xBA
+UNKNOWN_SIZE = -1
+
+
+def _vint_length(first: int) -> int:
+    for length in range(1, 9):
+        if first & (0x80 >> (length - 1)):
+            return length
+    return 0
+
+
+def _read_id(f) -> Optional[int]:
+    first = f.read(1)
+    if not first:
+        return None
+    length = _vint_length(first[0])
+    if length == 0 or length > 4:
+        return None
+    return int.from_bytes(first + f.read(length - 1), "big")
+
+
+def _read_size(f) -> Optional[int]:
+    first = f.read(1)
+    if not first:
+        return None
+    length = _vint_length(first[0])
+    if length == 0:
+        return None
+    value = first[0] & (0xFF >> length)
+    rest = f.read(length - 1)
+    all_ones = value == (0xFF >> length)
+    for byte in rest:
+        value = (value << 8) | byte
+        all_ones = all_ones and byte == 0xFF
+    return UNKNOWN_SIZE if all_ones else value
+
+
+def _iter_elements(data: bytes):
+    """(id, payload) for every element in an in-memory master element"""
+    pos = 0
+    end = len(data)
+    while pos < end:
+        length = _vint_length(data[pos])
+        if length == 0 or length > 4 or pos + length > end:
+            return
+        element_id = int.from_bytes(data[pos:pos + length], "big")
+        pos += length
+        if pos >= end:
+            return
+        length = _vint_length(data[pos])
+        if length == 0 or pos + length > end:
+            return
+        size = data[pos] & (0xFF >> length)
+        for byte in data[pos + 1:pos + length]:
+            size = (size << 8) | byte
+        pos += length
+        yield element_id, data[pos:pos + size]
+        pos += size
+
+
+def _uint(payload: bytes) -> int:
+    return int.from_bytes(payload, "big")
+
+
+def _float(payload: bytes) -> float:
+    if len(payload) == 4:
+        return struct.unpack(">f", payload)[0]
+    if len(payload) == 8:
+        return struct.unpack(">d", payload)[0]
+    return 0.0
+
+
+def parse_matroska(f) -> VideoMetadata:
+    if _read_id(f) != EBML_HEADER:
+        return EMPTY_METADATA
+    size = _read_size(f)
+    if size is None or size == UNKNOWN_SIZE:
+        return EMPTY_METADATA
+    f.seek(size, os.SEEK_CUR)
+
+    if _read_id(f) != SEGMENT or _read_size(f) is None:
+        return EMPTY_METADATA
+
+    info = tracks = None
+    # Walk the Segment's children up to the first Cluster, reading only Info and Tracks
+    while info is None or tracks is None:
+        element_id = _read_id(f)
+        size = _read_size(f)
+        if element_id is None or size is None or size == UNKNOWN_SIZE:
+            break
+        if element_id == CLUSTER:
+            break
+        if element_id in (INFO, TRACKS):
+            if size > MAX_EBML_ELEMENT_BYTES:
+                break
+            payload = f.read(size)
+            if element_id == INFO:
+                info = payload
+            else:
+                tracks = payload
+        else:
+            f.seek(size, os.SEEK_CUR)
+
+    duration = 0.0
+    if info is not None:
+        timecode_scale = 1000000
+        raw_duration = 0.0
+        for element_id, payload in _iter_elements(info):
+            if element_id == TIMECODE_SCALE:
+                timecode_scale = _uint(payload)
+            elif element_id == DURATION:
+                raw_duration = _float(payload)
+        duration = raw_duration * timecode_scale / 1e9
+        if not math.isfinite(duration) or duration < 0:
+            # Corrupt Duration float, treat it as missing
+            duration = 0.0
+
+    fps = 0.0
+    width = height = 0
+    if tracks is not None:
+        for element_id, entry in _iter_elements(tracks):
+            if element_id != TRACK_ENTRY:
+                continue
+            fields = dict(_iter_elements(entry))
+            if _uint(fields.get(TRACK_TYPE, b"")) != 1:
+                continue
+            default_duration = _uint(fields.get(DEFAULT_DURATION, b""))
+            if default_duration:
+                fps = 1e9 / default_duration
+            video = dict(_iter_elements(fields.get(VIDEO, b"")))
+            width = _uint(video.get(PIXEL_WIDTH, b""))
+            height = _uint(video.get(PIXEL_HEIGHT, b""))
+            break
+
+    # Matroska has no frame count in its headers, estimate it from the frame duration
+    frame_count = int(round(duration * fps)) if duration and fps else 0
+    return VideoMetadata(duration=duration, fps=fps, width=width, height=height, frame_count=frame_count)
+
+
+def parse_video_metadata(path: str) -> VideoMetadata:
+    """Read duration, fps, resolution and frame count from container headers without decoding"""
+    with open(path, "rb") as f:
+        head = f.read(12)
+        f.seek(0)
+        if head[:4] == b"\x1a\x45\xdf\xa3":
+            return parse_matroska(f)
+        if head[4:8] in (b"ftyp", b"moov", b"mdat", b"free", b"wide", b"skip", b"pnot"):
+            return parse_mp4(f)
+    return EMPTY_METADATA
+
+
+# Parsed metadata keyed by path, validated by (mtime, size)
+MAX_CACHED_METADATA = 4096
+_metadata_cache = OrderedDict()  # path -> (mtime_ns, size, VideoMetadata)
+_lock = threading.Lock()
+
+
+def video_metadata(path: str) -> VideoMetadata:
+    """Cached header metadata for a video file; EMPTY_METADATA if it can't be read"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return EMPTY_METADATA
+    fingerprint = (stat.st_mtime_ns, stat.st_size)
+
+    with _lock:
+        cached = _metadata_cache.get(path)
+        if cached is not None and cached[:2] == fingerprint:
+            _metadata_cache.move_to_end(path)
+            return cached[2]
+
+    try:
+        metadata = parse_video_metadata(path)
+    except (OSError, struct.error, IndexError, ValueError, OverflowError) as e:
+        print(f"Error reading video metadata from {path}: {str(e)}")
+        metadata = EMPTY_METADATA
+
+    with _lock:
+        _metadata_cache[path] = fingerprint + (metadata,)
+        _metadata_cache.move_to_end(path)
+        while len(_metadata_cache) > MAX_CACHED_METADATA:
+            _metadata_cache.popitem(last=False)
+    return metadata
@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Iterable
+
+
+READ_CHUNK_BYTES = 4 * 1024 * 1024
+MAX_TRACKED_FILES = 256
+
+
+class VideoPrefetcher:
+    """
+    Background read-ahead for upcoming videos. A single worker thread reads the next files
+    sequentially so they are in the OS page cache by the time a video loader opens them.
+    posix_fadvise(WILLNEED) is issued first where available so the kernel can start early
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._pending = deque()  # paths still to warm for the current window
+        self._budget = 0  # bytes left in the current window
+        self._wanted = frozenset()  # every path in the current window, the worker drops the rest
+        self._current = None  # path being read right now
+        self._warmed = OrderedDict()  # path -> (mtime_ns, size, bytes read, seconds, finished at)
+        self._thread = None
+        # Whether this prefetcher read a file before it was requested. The page cache itself
+        # isn't inspected, so a file may be cached anyway or evicted again in between
+        self.prefetched = 0
+        self.not_prefetched = 0
+
+    def schedule(self, paths: Iterable[str], budget_bytes: int):
+        """Replace the read-ahead window with paths, warming at most budget_bytes in total"""
+        with self._cond:
+            paths = list(paths)
+            self._wanted = frozenset(paths)
+            # A file that is already being read keeps going if it's still wanted
+            self._pending = deque(path for path in paths if path != self._current and not self._is_warm(path))
+            self._budget = budget_bytes
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True, name="video-prefetch")
+                self._thread.start()
+            self._cond.notify()
+
+    def _is_warm(self, path: str) -> bool:
+        record = self._warmed.get(path)
+        if record is None:
+            return False
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return record[:2] == (stat.st_mtime_ns, stat.st_size)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending or self._budget <= 0:
+                    self._cond.wait()
+                path = self._pending.popleft()
+                budget = self._budget
+                self._current = path
+
+            try:
+                record = self._warm(path, budget)
+            except OSError:
+                record = None
+
+            with self._cond:
+                self._current = None
+                if record is not None:
+                    if path in self._wanted:
+                        self._budget -= record[2]
+                    self._warmed[path] = record
+                    self._warmed.move_to_end(path)
+                    while len(self._warmed) > MAX_TRACKED_FILES:
+                        self._warmed.popitem(last=False)
+                self._cond.notify_all()
+
+    def _warm(self, path: str, budget: int):
+        """Read up to budget bytes of path; returns its record, or None if the window moved on"""
+        start = time.perf_counter()
+        stat = os.stat(path)
+        to_read = min(stat.st_size, budget)
+        read = 0
+        buffer = memoryview(bytearray(READ_CHUNK_BYTES))
+        with open(path, 'rb', buffering=0) as f:
+            if hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(f.fileno(), 0, to_read, os.POSIX_FADV_WILLNEED)
+            while read < to_read:
+                if path not in self._wanted:
+                    return None
+                # The last chunk stops at the budget
+                n = f.readinto(buffer[:min(READ_CHUNK_BYTES, to_read - read)])
+                if not n:
+                    break
+                read += n
+        return (stat.st_mtime_ns, stat.st_size, read, time.perf_counter() - start, time.time())
+
+    def report(self, path: str) -> str:
+        """Count whether path was read ahead before it was requested and describe it"""
+        with self._cond:
+            record = self._warmed.get(path) if self._is_warm(path) else None
+            in_progress = self._current == path
+            if record is not None:
+                self.prefetched += 1
+            else:
+                self.not_prefetched += 1
+            counts = f"{self.prefetched} prefetched, {self.not_prefetched} not prefetched"
+
+        if record is not None:
+            _, size, read, seconds, finished = record
+            coverage = "" if read >= size else f", first {read / 2**20:.0f} of {size / 2**20:.0f} MB"
+            return (f"Prefetched: read {read / 2**20:.1f} MB in {seconds:.2f}s, "
+                    f"{time.time() - finished:.1f}s ago{coverage} ({counts})")
+        if in_progress:
+            return f"Not prefetched: still reading ({counts})"
+        return f"Not prefetched ({counts})"
+
+
+# Shared by every SimpleVideoLoop instance
+VIDEO_PREFETCHER = VideoPrefetcher()
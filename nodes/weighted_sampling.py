@@ -0,0 +1,110 @@
+import heapq
+import math
+from typing import List, Sequence, Tuple
+
+
+def build_alias_table(weights: Sequence[float]) -> Tuple[List[float], List[int]]:
+    """Vose's alias method: O(n) setup for O(1) weighted draws. All-zero weights draw uniformly"""
+    n = len(weights)
+    if n == 0:
+        raise ValueError("Weighted sampling needs at least one item")
+    total = float(sum(weights))
+    if total <= 0:
+        return [1.0] * n, list(range(n))
+
+    scaled = [w * n / total for w in weights]
+    prob = [0.0] * n
+    alias = list(range(n))
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+
+    while small and large:
+        s = small.pop()
+        l = large.pop()
+        prob[s] = scaled[s]
+        alias[s] = l
+        scaled[l] = scaled[l] + scaled[s] - 1.0
+        (small if scaled[l] < 1.0 else large).append(l)
+
+    # Leftovers are 1.0 up to floating point error
+    for i in large + small:
+        prob[i] = 1.0
+    return prob, alias
+
+
+class AliasTable:
+    """In-memory alias table over weights"""
+
+    def __init__(self, weights: Sequence[float]):
+        self.weights = [max(0.0, float(w)) for w in weights]
+        self.prob, self.alias = build_alias_table(self.weights)
+
+    def __len__(self):
+        return len(self.weights)
+
+    def entry(self, index: int) -> Tuple[float, float, int]:
+        """(weight, prob, alias) for one slot"""
+        return self.weights[index], self.prob[index], self.alias[index]
+
+    def weight(self, index: int) -> float:
+        return self.weights[index]
+
+    def all_weights(self) -> Sequence[float]:
+        return self.weights
+
+    def draw(self, rng) -> int:
+        return alias_draw(rng, self)
+
+
+def alias_draw(rng, table) -> int:
+    """One O(1) weighted draw from any table exposing __len__ and entry(i)"""
+    index = rng.randrange(len(table))
+    _, prob, alias = table.entry(index)
+    return index if rng.random() < prob else alias
+
+
+def weighted_choices(rng, table, k: int) -> List[int]:
+    """k weighted draws with replacement, O(k)"""
+    return [alias_draw(rng, table) for _ in range(k)]
+
+
+def exponential_key(rng, weight: float) -> float:
+    """Efraimidis-Spirakis key: the k largest keys are a weighted sample without replacement"""
+    if weight <= 0:
+        return -math.inf
+    return math.log(1.0 - rng.random()) / weight
+
+
+def weighted_sample(rng, table, k: int, max_attempts_per_item: int = 32) -> List[int]:
+    """
+    k weighted draws without replacement. Draws from the alias table and rejects repeats,
+    which is O(k) unless a few items hold most of the weight; in that case it finishes the
+    remaining picks with exponential keys over the rest of the table
+    """
+    n = len(table)
+    chosen = []
+    seen = set()
+    attempts = 0
+    while len(chosen) < k and attempts < max_attempts_per_item * k:
+        attempts += 1
+        index = alias_draw(rng, table)
+        if index not in seen:
+            seen.add(index)
+            chosen.append(index)
+
+    if len(chosen) < k:
+        # Given the picks so far, the rest is a weighted sample of the remaining items
+        weights = table.all_weights()
+        keyed = ((exponential_key(rng, weights[i]), i) for i in range(n) if i not in seen)
+        rest = [i for key, i in heapq.nlargest(k - len(chosen), keyed) if key != -math.inf]
+        chosen.extend(rest)
+    return chosen
+
+
+def weighted_sample_items(rng, items: Sequence, weights: Sequence[float], k: int) -> list:
+    """
+    Weighted k-of-n sample without replacement via exponential keys, O(n log k).
+    Suited to pools that are rebuilt on every call, where an alias table wouldn't pay off
+    """
+    keyed = ((exponential_key(rng, w), i) for i, w in enumerate(weights))
+    return [items[i] for key, i in heapq.nlargest(k, keyed) if key != -math.inf]
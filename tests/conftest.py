@@ -0,0 +1,24 @@
+import os
+import sys
+import types
+
+import pytest
+
+# The node modules are imported as the "nodes" package straight from the repo, without ComfyUI.
+# Only folder_paths is needed by the modules under test, backed by a temporary directory.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+folder_paths = types.ModuleType("folder_paths")
+folder_paths.base_path = None
+folder_paths.get_user_directory = lambda: os.path.join(folder_paths.base_path, "user")
+folder_paths.get_input_directory = lambda: os.path.join(folder_paths.base_path, "input")
+folder_paths.get_folder_paths = lambda name: [os.path.join(folder_paths.base_path, name)]
+sys.modules.setdefault("folder_paths", folder_paths)
+
+
+@pytest.fixture(autouse=True)
+def comfy_dirs(tmp_path):
+    folder_paths.base_path = str(tmp_path)
+    for name in ("user", "input", "loras"):
+        os.makedirs(tmp_path / name, exist_ok=True)
+    return tmp_path
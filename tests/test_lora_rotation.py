@@ -0,0 +1,49 @@
+from collections import Counter
+
+from nodes import lora_rotation
+from nodes.lora_rotation import draw_from_bag
+from nodes.state_file import JsonStateFile
+
+
+NAMES = [f"lora_{i}.safetensors" for i in range(7)]
+
+
+def test_every_lora_once_per_pass():
+    drawn = []
+    for count in [3, 2, 4, 1, 3, 5, 3]:
+        chosen, _ = draw_from_bag(NAMES, NAMES, count)
+        assert len(set(chosen)) == len(chosen) == count
+        drawn.extend(chosen)
+    # 21 draws are exactly three passes, whatever the refills held back
+    assert Counter(drawn) == Counter({name: 3 for name in NAMES})
+
+
+def test_bag_ignores_slot_order():
+    first, _ = draw_from_bag(NAMES, NAMES, 4)
+    reordered = list(reversed(NAMES))
+    rest, _ = draw_from_bag(reordered, reordered, 3)
+    assert sorted(first + rest) == sorted(NAMES)
+
+
+def test_workers_share_the_rotation(monkeypatch):
+    # Two processes each have their own cached copy of the state file
+    workers = [lora_rotation._state, JsonStateFile("lora_rotation.json")]
+    drawn = []
+    for i in range(14):
+        monkeypatch.setattr(lora_rotation, "_state", workers[i % 2])
+        drawn.extend(draw_from_bag(NAMES, NAMES, 1)[0])
+    assert Counter(drawn[:7]) == Counter(NAMES)
+    assert Counter(drawn[7:]) == Counter(NAMES)
+
+
+def test_rejected_loras_stay_in_the_bag():
+    big = set(NAMES[:3])
+    drawn = []
+    for _ in range(4):
+        chosen, _ = draw_from_bag(NAMES, NAMES, 2, fits=lambda name: name not in big)
+        assert not big & set(chosen)
+        drawn.extend(chosen)
+    # The small LoRAs still come once per pass, the big ones wait for a draw they fit
+    assert Counter(drawn) == Counter({name: 2 for name in NAMES[3:]})
+    chosen, _ = draw_from_bag(NAMES, NAMES, 3)
+    assert set(chosen) == big
@@ -0,0 +1,79 @@
+import itertools
+import math
+
+import pytest
+
+from nodes.rng import CounterRandom, FeistelPermutation, unrank_combination, unrank_multiset
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 3, 5, 7, 16, 17, 100, 257, 1025])
+def test_feistel_is_a_bijection(n):
+    permutation = FeistelPermutation(n, 12345, "test")
+    values = [permutation[i] for i in range(n)]
+    assert sorted(values) == list(range(n))
+    assert all(permutation.index(value) == i for i, value in enumerate(values))
+
+
+def test_feistel_wide_domain_uses_hash_rounds():
+    n = 2 ** 70 + 3
+    permutation = FeistelPermutation(n, 7, "test")
+    assert permutation.half_bits > 32
+    for i in (0, 1, 2, n - 2, n - 1, 2 ** 69):
+        value = permutation[i]
+        assert 0 <= value < n
+        assert permutation.index(value) == i
+
+
+def test_feistel_depends_on_seed_and_stream():
+    base = [FeistelPermutation(50, 1, "a")[i] for i in range(50)]
+    assert base != [FeistelPermutation(50, 2, "a")[i] for i in range(50)]
+    assert base != [FeistelPermutation(50, 1, "b")[i] for i in range(50)]
+
+
+def test_feistel_rejects_out_of_range():
+    permutation = FeistelPermutation(5, 0)
+    with pytest.raises(IndexError):
+        permutation[5]
+    with pytest.raises(ValueError):
+        permutation.index(-1)
+
+
+def rank_combination(indices):
+    """Colex rank of an ascending index list, the inverse of unrank_combination"""
+    return sum(math.comb(c, i + 1) for i, c in enumerate(indices))
+
+
+@pytest.mark.parametrize("n, k", [(1, 1), (5, 0), (5, 2), (6, 3), (9, 4), (10, 10), (12, 5)])
+def test_unrank_combination_round_trips(n, k):
+    total = math.comb(n, k)
+    subsets = [unrank_combination(rank, n, k) for rank in range(total)]
+    for rank, subset in enumerate(subsets):
+        assert subset == sorted(subset) and len(set(subset)) == k
+        assert all(0 <= c < n for c in subset)
+        assert rank_combination(subset) == rank
+    assert sorted(map(tuple, subsets)) == list(itertools.combinations(range(n), k))
+
+
+@pytest.mark.parametrize("n, k", [(1, 3), (3, 2), (4, 4), (6, 3)])
+def test_unrank_multiset_round_trips(n, k):
+    total = math.comb(n + k - 1, k)
+    multisets = [unrank_multiset(rank, n, k) for rank in range(total)]
+    for rank, multiset in enumerate(multisets):
+        # Back to the combination it came from, then to its rank
+        assert rank_combination([c + i for i, c in enumerate(multiset)]) == rank
+    assert sorted(map(tuple, multisets)) == list(itertools.combinations_with_replacement(range(n), k))
+
+
+def test_unrank_large_rank_without_enumeration():
+    n, k = 10 ** 6, 6
+    rank = math.comb(n, k) - 1
+    assert unrank_combination(rank, n, k) == list(range(n - k, n))
+    with pytest.raises(ValueError):
+        unrank_combination(rank + 1, n, k)
+
+
+def test_counter_random_is_reproducible_and_stream_separated():
+    first, again = CounterRandom(9, "node:1"), CounterRandom(9, "node:1")
+    assert [first.random() for _ in range(5)] == [again.random() for _ in range(5)]
+    a, b = CounterRandom(9, "node:1"), CounterRandom(9, "node:2")
+    assert [a.random() for _ in range(5)] != [b.random() for _ in range(5)]
@@ -0,0 +1,78 @@
+import struct
+
+import pytest
+
+from nodes.video_metadata import EMPTY_METADATA, parse_video_metadata, video_metadata
+
+
+def box(box_type, payload=b""):
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def full_box(box_type, payload):
+    # version 0, flags 0
+    return box(box_type, b"\0\0\0\0" + payload)
+
+
+def make_mp4(width, height, timescale, duration, frames, frame_delta):
+    tkhd = full_box(b"tkhd", bytes(20 + 52) + struct.pack(">II", width << 16, height << 16))
+    mdhd = full_box(b"mdhd", bytes(8) + struct.pack(">II", timescale, duration) + bytes(4))
+    hdlr = full_box(b"hdlr", bytes(4) + b"vide" + bytes(12) + b"\0")
+    stts = full_box(b"stts", struct.pack(">III", 1, frames, frame_delta))
+    stbl = box(b"stbl", stts)
+    mdia = box(b"mdia", mdhd + hdlr + box(b"minf", stbl))
+    mvhd = full_box(b"mvhd", bytes(8) + struct.pack(">II", 1000, duration * 1000 // timescale) + bytes(80))
+    moov = box(b"moov", mvhd + box(b"trak", tkhd + mdia))
+    # mdat before moov, as written by most encoders without faststart
+    return box(b"ftyp", b"isom\0\0\0\0") + box(b"mdat", bytes(64)) + moov
+
+
+def element(element_id, payload):
+    # IDs are written with their marker bits; sizes as 8-byte vints
+    id_bytes = element_id.to_bytes((element_id.bit_length() + 7) // 8, "big")
+    return id_bytes + b"\x01" + len(payload).to_bytes(7, "big") + payload
+
+
+def make_mkv(duration_ms, frame_ns, width, height, duration_format=">d"):
+    info = element(0x2AD7B1, (1000000).to_bytes(3, "big")) + element(0x4489, struct.pack(duration_format, duration_ms))
+    video = element(0xB0, width.to_bytes(2, "big")) + element(0xBA, height.to_bytes(2, "big"))
+    track = element(0x83, b"\x01") + element(0x23E383, frame_ns.to_bytes(4, "big")) + element(0xE0, video)
+    segment = element(0x1549A966, info) + element(0x1654AE6B, element(0xAE, track)) + element(0x1F43B675, bytes(32))
+    # Segment with an unknown size, as live muxers write it
+    return element(0x1A45DFA3, b"\x42\x82\x84webm") + b"\x18\x53\x80\x67\x01\xff\xff\xff\xff\xff\xff\xff" + segment
+
+
+def write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_mp4_moov_after_mdat(tmp_path):
+    path = write(tmp_path, "clip.mp4", make_mp4(1920, 1080, 30000, 300300, 300, 1001))
+    metadata = parse_video_metadata(path)
+    assert (metadata.width, metadata.height, metadata.frame_count) == (1920, 1080, 300)
+    assert metadata.duration == pytest.approx(10.01)
+    assert metadata.fps == pytest.approx(29.97, abs=0.01)
+
+
+def test_matroska_info_and_tracks(tmp_path):
+    path = write(tmp_path, "clip.webm", make_mkv(5000.0, 40000000, 1280, 720))
+    metadata = parse_video_metadata(path)
+    assert (metadata.width, metadata.height) == (1280, 720)
+    assert metadata.duration == pytest.approx(5.0)
+    assert metadata.fps == pytest.approx(25.0)
+    assert metadata.frame_count == 125
+
+
+def test_matroska_infinite_duration_is_ignored(tmp_path):
+    path = write(tmp_path, "broken.mkv", make_mkv(float("inf"), 40000000, 1280, 720))
+    metadata = video_metadata(path)
+    assert (metadata.duration, metadata.frame_count) == (0.0, 0)
+    assert metadata.fps == pytest.approx(25.0)
+
+
+def test_unknown_and_truncated_files(tmp_path):
+    assert video_metadata(write(tmp_path, "notes.mp4", b"plain text, not a video")) == EMPTY_METADATA
+    truncated = make_mp4(640, 480, 600, 6000, 60, 100)[:-40]
+    assert video_metadata(write(tmp_path, "cut.mp4", truncated)).width == 0
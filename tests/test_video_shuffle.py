@@ -0,0 +1,64 @@
+import os
+from collections import Counter
+
+from nodes import video_index
+from nodes.video_index import shuffled_video
+
+
+def make_videos(folder, count):
+    paths = []
+    for i in range(count):
+        path = os.path.join(folder, f"clip_{i:02d}.mp4")
+        with open(path, 'wb'):
+            pass
+        paths.append(path)
+    return tuple(paths)
+
+
+def test_epochs_visit_every_file_once(comfy_dirs):
+    videos = make_videos(comfy_dirs / "input", 7)
+    walk = [shuffled_video("folder", videos, 3, loop_count)[0] for loop_count in range(21)]
+    for epoch in range(3):
+        assert sorted(walk[epoch * 7:(epoch + 1) * 7]) == sorted(videos)
+    assert walk[:7] != walk[7:14]
+
+
+def test_removed_file_is_dropped_from_the_epoch(comfy_dirs):
+    videos = make_videos(comfy_dirs / "input", 8)
+    seen = [shuffled_video("folder", videos, 5, loop_count)[0] for loop_count in range(3)]
+    removed = next(path for path in videos if path not in seen)
+    os.remove(removed)
+    listing = tuple(path for path in videos if path != removed)
+
+    loop_count = 3
+    while True:
+        path, position, length, epoch = shuffled_video("folder", listing, 5, loop_count)
+        if epoch:
+            break
+        seen.append(path)
+        loop_count += 1
+
+    assert length == 7
+    assert loop_count == 7
+    assert Counter(seen) == Counter(listing)
+
+
+def test_walk_survives_a_restart(comfy_dirs):
+    videos = make_videos(comfy_dirs / "input", 6)
+    first = [shuffled_video("folder", videos, 1, loop_count)[0] for loop_count in range(3)]
+    # Files added mid-epoch only join the next epoch, also after the in-memory caches are gone
+    video_index._snapshots.clear()
+    video_index._shuffle_state._data = None
+    added = str(comfy_dirs / "input" / "clip_99.mp4")
+    open(added, 'wb').close()
+    grown = videos + (added,)
+    rest = [shuffled_video("folder", grown, 1, loop_count)[0] for loop_count in range(3, 6)]
+    assert sorted(first + rest) == sorted(videos)
+
+
+def test_no_files_left(comfy_dirs):
+    videos = make_videos(comfy_dirs / "input", 2)
+    shuffled_video("folder", videos, 0, 0)
+    for path in videos:
+        os.remove(path)
+    assert shuffled_video("folder", (), 0, 1) is None
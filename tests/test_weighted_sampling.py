@@ -0,0 +1,74 @@
+import json
+from collections import Counter
+
+import pytest
+
+from nodes.character_library import load_character_library, select_characters
+from nodes.rng import CounterRandom
+from nodes.weighted_sampling import AliasTable, build_alias_table, weighted_choices, weighted_sample
+
+
+@pytest.mark.parametrize("weights", [
+    [1.0, 2.0, 3.0, 4.0],
+    [0.0, 5.0, 0.5, 0.0, 1.0],
+    [1000.0, 1.0, 1.0],
+])
+def test_alias_draw_frequencies_match_weights(weights):
+    table = AliasTable(weights)
+    draws = 50_000
+    counts = Counter(weighted_choices(CounterRandom(1, "test"), table, draws))
+    total = sum(weights)
+    for index, weight in enumerate(weights):
+        expected = draws * weight / total
+        # Five standard deviations of a binomial count
+        tolerance = 5 * (expected * (1 - weight / total)) ** 0.5 + 1
+        assert abs(counts[index] - expected) <= tolerance
+
+
+def test_alias_table_probabilities_are_exact():
+    weights = [3.0, 1.0, 0.0, 4.0]
+    prob, alias = build_alias_table(weights)
+    n = len(weights)
+    mass = [0.0] * n
+    for i in range(n):
+        mass[i] += prob[i] / n
+        mass[alias[i]] += (1.0 - prob[i]) / n
+    assert mass == pytest.approx([w / sum(weights) for w in weights])
+
+
+def test_all_zero_weights_draw_uniformly():
+    prob, alias = build_alias_table([0.0, 0.0, 0.0])
+    assert prob == [1.0, 1.0, 1.0] and alias == [0, 1, 2]
+
+
+def test_weighted_sample_without_repeats_skips_zero_weights():
+    table = AliasTable([100000.0, 1.0, 1.0, 0.0])
+    for seed in range(50):
+        picks = weighted_sample(CounterRandom(seed, "test"), table, 3)
+        assert len(picks) == len(set(picks)) == 3
+        assert 3 not in picks
+
+
+@pytest.mark.parametrize("extension", [".json", ".jsonl"])
+def test_library_with_only_zero_weights_falls_back_to_uniform(comfy_dirs, extension):
+    characters = [{"name": f"c{i}", "prompt": f"p{i}", "weight": 0} for i in range(4)]
+    path = comfy_dirs / "input" / f"chars{extension}"
+    if extension == ".json":
+        path.write_text(json.dumps({"base_style": {}, "characters": characters}))
+    else:
+        path.write_text("\n".join(json.dumps(c) for c in [{"base_style": {}}] + characters) + "\n")
+    library = load_character_library(str(path))
+    assert library.sampler is None
+    picked = select_characters(library, CounterRandom(0, "test"), 4, False)
+    assert sorted(c.name for c in picked) == ["c0", "c1", "c2", "c3"]
+
+
+def test_indexed_library_weighted_sample(comfy_dirs):
+    characters = [{"name": "heavy", "prompt": "h", "weight": 1e6}] + \
+                 [{"name": f"c{i}", "prompt": f"p{i}", "weight": 1} for i in range(5)]
+    path = comfy_dirs / "input" / "weighted.jsonl"
+    path.write_text("\n".join(json.dumps(c) for c in [{"base_style": {}}] + characters) + "\n")
+    library = load_character_library(str(path))
+    assert list(library.sampler.all_weights()) == [1e6, 1, 1, 1, 1, 1]
+    picked = select_characters(library, CounterRandom(3, "test"), 3, False)
+    assert len({c.name for c in picked}) == 3 and picked[0].name == "heavy"